@@ -1,15 +1,32 @@
 import asyncio
-from collections.abc import AsyncIterator
+import math
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import aclosing
 
+from app.angle_demux import AngleDemuxer, split_angle_sections
+from app.chunking import chunk_text
 from app.config import settings
-from app.llm_client import build_client, chat_once, chat_stream_events
+from app.deadline import Deadline, start_deadline, stream_with_timeout
+from app.digest_store import get_digest, paper_hash, put_digest
+from app.llm_client import CircuitOpenError, chat_once, chat_stream_events, get_client, is_retryable_error
+from app.metrics import incr
 from app.prompts import (
+    ANGLE_QUERY_HINTS,
     DEFAULT_ANGLE_SPECS,
+    DIGEST_PROMPT_VERSION,
     SYSTEM_PROMPT,
     build_angle_prompt,
+    build_angle_task,
+    build_chunk_notes_prompt,
+    build_digest_prompt,
     build_final_summary_prompt,
+    build_multi_angle_prompt,
+    build_paper_context,
 )
+from app.provider_catalog import get_model_limits
+from app.retrieval import build_index, select_context
 from app.schemas import AnalyzeOptions, AngleResult, AngleSpec, PaperAnalysisResponse
+from app.tokenizer import clip_to_tokens, count_tokens
 
 
 def clamp_text(raw_text: str, max_chars: int) -> str:
@@ -35,9 +52,55 @@ def pick_angle_specs(options: AnalyzeOptions) -> list[AngleSpec]:
     ]
 
 
+def model_limits(options: AnalyzeOptions) -> dict[str, int]:
+    return get_model_limits(options.model, str(options.base_url or "")) or {}
+
+
 def resolve_max_input_chars(options: AnalyzeOptions) -> int:
-    target = options.max_input_chars or settings.max_pdf_chars
-    return min(target, settings.max_pdf_chars)
+    if options.max_input_chars:
+        return min(options.max_input_chars, settings.max_pdf_chars)
+    context_length = model_limits(options).get("context_length")
+    if context_length:
+        # 已知上下文窗口时由 token 预算裁剪，字符上限只用于提前停止解析（约 4 字符/token）。
+        return min(context_length * 4, settings.max_auto_input_chars)
+    return settings.max_pdf_chars
+
+
+def resolve_output_tokens(options: AnalyzeOptions) -> int:
+    limits = model_limits(options)
+    max_completion = limits.get("max_completion_tokens")
+    if options.max_output_tokens:
+        requested = options.max_output_tokens
+    elif limits:
+        context_length = limits.get("context_length") or settings.default_context_tokens
+        requested = min(
+            max_completion or settings.max_output_tokens,
+            settings.auto_max_output_tokens,
+            context_length // 4,
+        )
+    else:
+        requested = settings.max_output_tokens
+    return min(requested, max_completion) if max_completion else requested
+
+
+def extraction_char_budget(options: AnalyzeOptions) -> int | None:
+    if options.context_mode in ("map_reduce", "retrieval"):
+        # map-reduce 与检索模式需要读完全文。
+        return None
+    # 分析只会用到前 N 个字符，解析阶段达到该长度即可停止。
+    return resolve_max_input_chars(options)
+
+
+def _is_truncated(paper_text: str, clipped_text: str, extraction: dict | None) -> bool:
+    return bool((extraction or {}).get("truncated")) or len(clipped_text) < len(paper_text)
+
+
+def paper_sections(extraction: dict | None) -> list[dict]:
+    """Section map from the extraction step, with each section's character size."""
+    return [
+        {"name": section["name"], "heading": section["heading"], "chars": section["end"] - section["start"]}
+        for section in (extraction or {}).get("sections") or []
+    ]
 
 
 def reasoning_config(options: AnalyzeOptions) -> dict | None:
@@ -46,6 +109,346 @@ def reasoning_config(options: AnalyzeOptions) -> dict | None:
     return {"enabled": True, "effort": options.reasoning_effort}
 
 
+def llm_call_options(options: AnalyzeOptions) -> dict:
+    return {
+        "model": options.model,
+        "temperature": options.temperature,
+        "max_output_tokens": resolve_output_tokens(options),
+        "reasoning": reasoning_config(options),
+        "use_cache": not options.bypass_cache,
+    }
+
+
+def angle_prompt_parts(
+    options: AnalyzeOptions,
+    paper_title: str,
+    paper_text: str,
+    angle_spec: AngleSpec,
+) -> tuple[str | None, str]:
+    """Return ``(shared_prefix, prompt)`` for one angle call."""
+    if options.prompt_layout == "prefix_cache":
+        # 论文正文放在前面，各角度请求共享同一前缀，便于服务商命中提示词缓存。
+        return (
+            build_paper_context(paper_title, paper_text),
+            build_angle_task(angle_spec.title, angle_spec.prompt, options.user_prompt),
+        )
+    prompt = build_angle_prompt(
+        angle_title=angle_spec.title,
+        angle_instruction=angle_spec.prompt,
+        paper_title=paper_title,
+        paper_text=paper_text,
+        user_prompt=options.user_prompt,
+    )
+    return None, prompt
+
+
+def single_call_prompt(options: AnalyzeOptions, paper_title: str, paper_text: str, angle_specs: list[AngleSpec]) -> str:
+    return build_multi_angle_prompt(
+        [(spec.title, spec.prompt) for spec in angle_specs],
+        paper_title=paper_title,
+        paper_text=paper_text,
+        user_prompt=options.user_prompt,
+    )
+
+
+def single_call_options(options: AnalyzeOptions, angle_count: int) -> dict:
+    # 一次输出全部角度，输出上限按角度数放大。
+    call_options = llm_call_options(options)
+    cap = min(call_options["max_output_tokens"] * angle_count, settings.single_call_max_output_tokens)
+    max_completion = model_limits(options).get("max_completion_tokens")
+    if max_completion:
+        cap = min(cap, max_completion)
+    return {**call_options, "max_output_tokens": cap}
+
+
+def model_context_tokens(options: AnalyzeOptions) -> int:
+    return model_limits(options).get("context_length") or settings.default_context_tokens
+
+
+def output_token_budget(options: AnalyzeOptions, angle_count: int) -> int:
+    if options.stream_mode == "single_call":
+        return single_call_options(options, angle_count)["max_output_tokens"]
+    return resolve_output_tokens(options)
+
+
+def prompt_overhead_tokens(options: AnalyzeOptions, paper_title: str, angle_specs: list[AngleSpec]) -> int:
+    """Tokens of the largest prompt sent for this paper, excluding the paper text itself."""
+    if options.stream_mode == "single_call":
+        prompts = [single_call_prompt(options, paper_title, "", angle_specs)]
+    else:
+        prompts = [
+            "\n\n".join(part for part in angle_prompt_parts(options, paper_title, "", spec) if part)
+            for spec in angle_specs
+        ]
+    largest = max((count_tokens(prompt, options.model) for prompt in prompts), default=0)
+    return count_tokens(SYSTEM_PROMPT, options.model) + largest
+
+
+def fit_paper_text(
+    options: AnalyzeOptions,
+    paper_title: str,
+    paper_text: str,
+    angle_specs: list[AngleSpec],
+) -> tuple[str, dict]:
+    """Clip the paper to the model's context window left after prompt and output budget."""
+    text = clamp_text(paper_text, resolve_max_input_chars(options))
+    context_tokens = model_context_tokens(options)
+    overhead_tokens = prompt_overhead_tokens(options, paper_title, angle_specs)
+    output_tokens = output_token_budget(options, len(angle_specs))
+    budget = context_tokens - overhead_tokens - output_tokens - settings.context_safety_tokens
+    if options.max_input_tokens:
+        budget = min(budget, options.max_input_tokens)
+    budget = max(budget, settings.min_input_tokens)
+    clipped = clip_to_tokens(text, budget, options.model)
+    estimate = {
+        "paper_tokens": count_tokens(clipped, options.model),
+        "input_budget_tokens": budget,
+        "prompt_overhead_tokens": overhead_tokens,
+        "max_output_tokens": output_tokens,
+        "context_tokens": context_tokens,
+        "limits_source": "catalog" if model_limits(options) else "default",
+    }
+    return clipped, estimate
+
+
+USAGE_FIELDS = ("prompt_tokens", "cached_tokens", "completion_tokens")
+
+
+def add_usage(total: dict[str, int], ev: dict) -> None:
+    for field in USAGE_FIELDS:
+        total[field] = total.get(field, 0) + ev.get(field, 0)
+
+
+def usage_fields(ev: dict) -> dict[str, int]:
+    return {field: ev.get(field, 0) for field in USAGE_FIELDS}
+
+
+def resilience_event(scope: str, ev: dict, **fields) -> dict:
+    """Map a llm_client ``retry``/``circuit_open`` event to an SSE event."""
+    payload = {key: value for key, value in ev.items() if key != "type"}
+    return {"event": f"{scope}_{ev['type']}", **fields, **payload}
+
+
+def _should_fallback_to_once(exc: Exception, streamed_content: bool) -> bool:
+    if isinstance(exc, CircuitOpenError):
+        return False
+    # 瞬时错误已在流式调用内退避重试过；只有中途断流或服务商不支持流式时才改用非流式调用。
+    return streamed_content or not is_retryable_error(exc)
+
+
+def plan_map_chunks(options: AnalyzeOptions, paper_text: str, input_budget_tokens: int) -> dict:
+    total_tokens = count_tokens(paper_text, options.model)
+    # 片段数超过上限时放大片段（不超过单次输入预算），尽量覆盖全文。
+    chunk_tokens = max(
+        min(settings.map_chunk_tokens, input_budget_tokens),
+        min(math.ceil(total_tokens / max(settings.map_max_chunks, 1)), input_budget_tokens),
+    )
+    chunks = chunk_text(paper_text, chunk_tokens, settings.map_chunk_overlap_tokens, options.model)
+    return {
+        "chunks": chunks[: settings.map_max_chunks],
+        "chunks_dropped": max(0, len(chunks) - settings.map_max_chunks),
+        "chunk_tokens": chunk_tokens,
+        "paper_tokens": total_tokens,
+    }
+
+
+async def _map_paper(
+    client,
+    options: AnalyzeOptions,
+    paper_title: str,
+    plan: dict,
+    angle_specs: list[AngleSpec],
+    usage: dict[str, int],
+    emit: Callable[[dict], Awaitable[None]],
+) -> str:
+    """Map step: extract angle-relevant notes from every planned chunk in parallel.
+
+    Returns the joined notes, which replace the paper text in the per-angle (reduce) calls.
+    """
+    chunks = plan["chunks"]
+    titles = [spec.title for spec in angle_specs]
+    await emit(
+        {
+            "event": "map_start",
+            "chunks": len(chunks),
+            "chunk_tokens": plan["chunk_tokens"],
+            "paper_tokens": plan["paper_tokens"],
+        }
+    )
+    call_options = {
+        **llm_call_options(options),
+        "max_output_tokens": settings.map_output_tokens,
+        "reasoning": {"enabled": False},
+    }
+    done = 0
+    errors: list[str] = []
+
+    async def run(index: int, chunk: str) -> str:
+        nonlocal done
+
+        async def report(ev: dict) -> None:
+            if ev["type"] == "usage":
+                add_usage(usage, ev)
+            else:
+                await emit(resilience_event("map", ev, chunk=index))
+
+        error = None
+        notes = ""
+        try:
+            notes = await chat_once(
+                client=client,
+                system_prompt=SYSTEM_PROMPT,
+                user_prompt=build_chunk_notes_prompt(titles, paper_title, index, len(chunks), chunk),
+                on_event=report,
+                **call_options,
+            )
+        except Exception as exc:
+            # 单个片段失败不影响其余片段，汇总时缺少该片段的信息。
+            error = str(exc)
+            errors.append(error)
+        done += 1
+        progress = {"event": "map_progress", "chunk": index, "done": done, "total": len(chunks)}
+        if error:
+            progress["error"] = error
+        await emit(progress)
+        return clean_analysis_output(notes).strip()
+
+    notes = await asyncio.gather(*(run(index, chunk) for index, chunk in enumerate(chunks, start=1)))
+    joined = "\n\n".join(
+        f"## 片段 {index}/{len(chunks)}\n{text}"
+        for index, text in enumerate(notes, start=1)
+        if text and text != "无"
+    )
+    await emit(
+        {
+            "event": "map_done",
+            "chunks": len(chunks),
+            "chunks_dropped": plan["chunks_dropped"],
+            "failed": sum(1 for text in notes if not text),
+            "notes_tokens": count_tokens(joined, options.model),
+        }
+    )
+    if not joined:
+        # 调用方据此退回按预算截取的原文，并以 preprocess_error 告知原因。
+        raise RuntimeError(f"全部片段提取失败：{errors[0]}" if errors else "各片段均未提取到有效信息")
+    return joined
+
+
+def retrieve_angle_contexts(
+    options: AnalyzeOptions,
+    paper_text: str,
+    angle_specs: list[AngleSpec],
+    budget_tokens: int,
+) -> tuple[dict[str, str], dict]:
+    """Per-angle excerpts picked by BM25 from one index over the full paper."""
+    index = build_index(paper_text, settings.retrieval_chunk_tokens, options.model)
+    contexts = {}
+    for spec in angle_specs:
+        query = " ".join(part for part in (spec.title, spec.prompt, ANGLE_QUERY_HINTS.get(spec.title)) if part)
+        contexts[spec.title] = select_context(index, query, budget_tokens, settings.retrieval_top_k, options.model)
+    stats = {
+        "chunks": len(index.chunks),
+        "angle_tokens": {title: count_tokens(text, options.model) for title, text in contexts.items()},
+    }
+    return contexts, stats
+
+
+def _uses_retrieval(options: AnalyzeOptions, paper_text: str, clipped_text: str) -> bool:
+    # 单次调用模式只有一个提示词，无法按角度取材；全文放得下时也无需检索。
+    return (
+        options.context_mode == "retrieval"
+        and options.stream_mode != "single_call"
+        and not options.mock_mode
+        and len(clipped_text) < len(paper_text)
+    )
+
+
+def _uses_digest(options: AnalyzeOptions, token_estimate: dict) -> bool:
+    # 短论文直接使用原文，浓缩收益有限。
+    return (
+        options.context_mode == "digest"
+        and not options.mock_mode
+        and token_estimate["paper_tokens"] >= settings.digest_min_paper_tokens
+    )
+
+
+async def _condense_paper(
+    client,
+    options: AnalyzeOptions,
+    paper_title: str,
+    paper_text: str,
+    clipped_text: str,
+    usage: dict[str, int],
+    emit: Callable[[dict], Awaitable[None]],
+) -> str:
+    """Condense ``clipped_text`` once into a digest shared by every angle.
+
+    Cached by the hash of the full normalised ``paper_text``, provider and model,
+    so the same paper hits the cache whatever the input budget.
+    """
+    key = paper_hash(paper_text)
+    base_url = str(options.base_url)
+    source_tokens = count_tokens(clipped_text, options.model)
+    cached = None
+    if not options.bypass_cache:
+        cached = await asyncio.to_thread(get_digest, key, base_url, options.model, DIGEST_PROMPT_VERSION)
+    await emit({"event": "digest_start", "paper_tokens": source_tokens, "cached": cached is not None})
+    if cached is not None:
+        await emit({"event": "digest_done", "digest_tokens": count_tokens(cached, options.model), "cached": True})
+        return cached
+
+    async def report(ev: dict) -> None:
+        if ev["type"] == "usage":
+            add_usage(usage, ev)
+        else:
+            await emit(resilience_event("digest", ev))
+
+    digest = await chat_once(
+        client=client,
+        system_prompt=SYSTEM_PROMPT,
+        user_prompt=build_digest_prompt(paper_title, clipped_text),
+        on_event=report,
+        **{**llm_call_options(options), "max_output_tokens": settings.digest_output_tokens},
+    )
+    digest = clean_analysis_output(digest).strip()
+    if not digest:
+        raise RuntimeError("论文浓缩摘要为空")
+    digest_tokens = count_tokens(digest, options.model)
+    await asyncio.to_thread(
+        put_digest, key, base_url, options.model, DIGEST_PROMPT_VERSION, digest, source_tokens, digest_tokens
+    )
+    await emit({"event": "digest_done", "digest_tokens": digest_tokens, "cached": False})
+    return digest
+
+
+async def _drain_events(queue: asyncio.Queue, task: asyncio.Task) -> AsyncIterator[dict]:
+    """Yield events a background task puts on ``queue`` until the task finishes."""
+    while True:
+        getter = asyncio.ensure_future(queue.get())
+        try:
+            await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            getter.cancel()
+            raise
+        if getter.done():
+            yield getter.result()
+            continue
+        getter.cancel()
+        while not queue.empty():
+            yield queue.get_nowait()
+        return
+
+
+def cancel_pending(tasks: list[asyncio.Task]) -> list[asyncio.Task]:
+    """Cancel unfinished ``tasks`` and count them; returns the ones cancelled."""
+    pending = [task for task in tasks if not task.done()]
+    for task in pending:
+        task.cancel()
+    if pending:
+        incr("analysis.cancelled_tasks", len(pending))
+    return pending
+
+
 def _mock_text(angle: str, paper_title: str) -> str:
     return (
         f"- 角度: {angle}\n"
@@ -81,83 +484,216 @@ async def _run_single_angle(
     paper_title: str,
     paper_text: str,
     angle_spec: AngleSpec,
+    usage: dict[str, int],
 ) -> AngleResult:
-    prompt = build_angle_prompt(
-        angle_title=angle_spec.title,
-        angle_instruction=angle_spec.prompt,
-        paper_title=paper_title,
-        paper_text=paper_text,
-        user_prompt=options.user_prompt,
-    )
+    shared_prefix, prompt = angle_prompt_parts(options, paper_title, paper_text, angle_spec)
+
+    async def report(ev: dict) -> None:
+        if ev["type"] == "usage":
+            add_usage(usage, ev)
+
     result = await chat_once(
         client=client,
-        model=options.model,
         system_prompt=SYSTEM_PROMPT,
         user_prompt=prompt,
-        temperature=options.temperature,
-        max_output_tokens=options.max_output_tokens or settings.max_output_tokens,
-        reasoning=reasoning_config(options),
+        shared_prefix=shared_prefix,
+        on_event=report,
+        **llm_call_options(options),
     )
     cleaned = clean_analysis_output(result)
     return AngleResult(angle=angle_spec.title, rounds=[cleaned], final=cleaned)
 
 
+async def _run_single_call(
+    client,
+    options: AnalyzeOptions,
+    paper_title: str,
+    paper_text: str,
+    angle_specs: list[AngleSpec],
+    usage: dict[str, int],
+) -> list[AngleResult]:
+    async def report(ev: dict) -> None:
+        if ev["type"] == "usage":
+            add_usage(usage, ev)
+
+    result = await chat_once(
+        client=client,
+        system_prompt=SYSTEM_PROMPT,
+        user_prompt=single_call_prompt(options, paper_title, paper_text, angle_specs),
+        on_event=report,
+        **single_call_options(options, len(angle_specs)),
+    )
+    sections = split_angle_sections(result, len(angle_specs))
+    angle_results: list[AngleResult | None] = []
+    for index, spec in enumerate(angle_specs, start=1):
+        cleaned = clean_analysis_output(sections.get(index, "").strip())
+        angle_results.append(AngleResult(angle=spec.title, rounds=[cleaned], final=cleaned) if cleaned else None)
+    # 模型漏掉的角度单独补一次调用。
+    missing = [spec for spec, result in zip(angle_specs, angle_results) if result is None]
+    retried = iter(
+        await asyncio.gather(
+            *(_run_single_angle(client, options, paper_title, paper_text, spec, usage) for spec in missing)
+        )
+    )
+    return [result or next(retried) for result in angle_results]
+
+
+def angle_timeout(deadline: Deadline | None, parts: int = 1) -> float | None:
+    return deadline.angle_slice(parts) if deadline else None
+
+
+def _timed_out_angle(title: str) -> AngleResult:
+    incr("analysis.angle_timeouts")
+    return AngleResult(angle=title, rounds=[], final="", timed_out=True)
+
+
 async def analyze_paper(
     options: AnalyzeOptions,
     paper_text: str,
     paper_title: str,
+    extraction: dict | None = None,
+    deadline: Deadline | None = None,
+    checkpoint: dict[str, AngleResult] | None = None,
+    on_angle_done: Callable[[AngleResult], Awaitable[None]] | None = None,
 ) -> PaperAnalysisResponse:
-    clipped_text = clamp_text(paper_text, resolve_max_input_chars(options))
+    """Analyze every angle and write the final report.
+
+    Angles already in ``checkpoint`` are reused instead of re-run, and
+    ``on_angle_done`` is awaited with each newly completed angle so callers can
+    persist it.
+    """
+    if deadline is None:
+        deadline = start_deadline(options.deadline_seconds)
     angle_specs = pick_angle_specs(options)
+    checkpoint = checkpoint or {}
+    pending_specs = [spec for spec in angle_specs if spec.title not in checkpoint]
+    clipped_text, token_estimate = fit_paper_text(options, paper_title, paper_text, angle_specs)
+    page_count = (extraction or {}).get("page_count")
+    map_plan = None
+    if options.context_mode == "map_reduce" and len(clipped_text) < len(paper_text) and not options.mock_mode:
+        map_plan = plan_map_chunks(options, paper_text, token_estimate["input_budget_tokens"])
+        text_truncated = bool((extraction or {}).get("truncated")) or map_plan["chunks_dropped"] > 0
+    else:
+        text_truncated = _is_truncated(paper_text, clipped_text, extraction)
+    angle_contexts: dict[str, str] = {}
+    if _uses_retrieval(options, paper_text, clipped_text):
+        # BM25 建索引与逐段计 token 是 CPU 密集操作，放到线程里避免阻塞事件循环。
+        angle_contexts, _ = await asyncio.to_thread(
+            retrieve_angle_contexts, options, paper_text, angle_specs, token_estimate["input_budget_tokens"]
+        )
     if options.mock_mode:
-        angle_results = [
-            AngleResult(
-                angle=spec.title,
-                rounds=[_mock_text(spec.title, paper_title)],
-                final=_mock_text(spec.title, paper_title),
-            )
-            for spec in angle_specs
-        ]
+        angle_results = []
+        for spec in angle_specs:
+            result = checkpoint.get(spec.title)
+            if result is None:
+                text = _mock_text(spec.title, paper_title)
+                result = AngleResult(angle=spec.title, rounds=[text], final=text)
+                # 模拟模式同样写检查点，后台任务的 angles_done 与真实调用一致。
+                if on_angle_done:
+                    await on_angle_done(result)
+            angle_results.append(result)
         return PaperAnalysisResponse(
             paper_title=paper_title,
             model=options.model or "mock-model",
             base_url=str(options.base_url or "mock://local"),
             text_char_count=len(clipped_text),
+            page_count=page_count,
+            text_truncated=text_truncated,
             angles=angle_results,
             final_report="模拟最终报告：各角度分析已完成，可用于健康检查。",
         )
 
-    client = build_client(options.api_key, str(options.base_url))
+    client = get_client(options.api_key, str(options.base_url))
 
-    # 限制并发，避免部分服务商限流导致全量失败。
-    semaphore = asyncio.Semaphore(3)
+    usage: dict[str, int] = {}
 
-    async def wrapped(angle_spec: AngleSpec) -> AngleResult:
-        async with semaphore:
-            return await _run_single_angle(client, options, paper_title, clipped_text, angle_spec)
+    async def report(ev: dict) -> None:
+        if ev["type"] == "usage":
+            add_usage(usage, ev)
 
-    angle_results = await asyncio.gather(*(wrapped(spec) for spec in angle_specs))
-    angle_map = {a.angle: a.final for a in angle_results}
+    async def ignore(_: dict) -> None:
+        # 非流式接口不推送 map/digest 进度事件。
+        return None
 
-    final_report_prompt = build_final_summary_prompt(angle_map)
-    final_report = await chat_once(
-        client=client,
-        model=options.model,
-        system_prompt=SYSTEM_PROMPT,
-        user_prompt=final_report_prompt,
-        temperature=options.temperature,
-        max_output_tokens=options.max_output_tokens or settings.max_output_tokens,
-        reasoning=reasoning_config(options),
-    )
-    final_report = clean_analysis_output(final_report)
+    async def finished(result: AngleResult) -> AngleResult:
+        if on_angle_done and not result.timed_out:
+            await on_angle_done(result)
+        return result
+
+    # 预处理（map/摘要）最多占用角度阶段的一半时间，超时或失败则退回原文节选；角度都已完成时无需预处理。
+    try:
+        async with asyncio.timeout(angle_timeout(deadline, 2)):
+            if pending_specs and map_plan:
+                notes = await _map_paper(client, options, paper_title, map_plan, angle_specs, usage, ignore)
+                clipped_text, _ = fit_paper_text(options, paper_title, notes, angle_specs)
+            elif pending_specs and _uses_digest(options, token_estimate):
+                clipped_text = await _condense_paper(client, options, paper_title, paper_text, clipped_text, usage, ignore)
+    except TimeoutError:
+        incr("analysis.preprocess_timeouts")
+    except Exception:
+        incr("analysis.preprocess_errors")
+
+    if not pending_specs:
+        angle_results = [checkpoint[spec.title] for spec in angle_specs]
+    elif options.stream_mode == "single_call":
+        try:
+            async with asyncio.timeout(angle_timeout(deadline)):
+                fresh = await _run_single_call(client, options, paper_title, clipped_text, pending_specs, usage)
+            for result in fresh:
+                await finished(result)
+        except TimeoutError:
+            fresh = [_timed_out_angle(spec.title) for spec in pending_specs]
+        results = {**checkpoint, **{result.angle: result for result in fresh}}
+        angle_results = [results[spec.title] for spec in angle_specs]
+    else:
+        timeout = angle_timeout(deadline)
+
+        async def run_angle(spec: AngleSpec) -> AngleResult:
+            if spec.title in checkpoint:
+                return checkpoint[spec.title]
+            try:
+                async with asyncio.timeout(timeout):
+                    return await finished(
+                        await _run_single_angle(
+                            client, options, paper_title, angle_contexts.get(spec.title, clipped_text), spec, usage
+                        )
+                    )
+            except TimeoutError:
+                return _timed_out_angle(spec.title)
+
+        # 并发由 llm_client 中按服务商自适应的限流器控制。
+        angle_results = await asyncio.gather(*(run_angle(spec) for spec in angle_specs))
+    # 超时的角度不进入最终报告。
+    angle_map = {a.angle: a.final for a in angle_results if not a.timed_out}
+
+    final_report = ""
+    final_report_timed_out = False
+    if angle_map:
+        try:
+            async with asyncio.timeout(deadline.remaining() if deadline else None):
+                final_report = await chat_once(
+                    client=client,
+                    system_prompt=SYSTEM_PROMPT,
+                    user_prompt=build_final_summary_prompt(angle_map),
+                    on_event=report,
+                    **llm_call_options(options),
+                )
+        except TimeoutError:
+            incr("analysis.final_timeouts")
+            final_report_timed_out = True
+        final_report = clean_analysis_output(final_report)
 
     return PaperAnalysisResponse(
         paper_title=paper_title,
         model=options.model,
         base_url=str(options.base_url),
         text_char_count=len(clipped_text),
+        page_count=page_count,
+        text_truncated=text_truncated,
         angles=angle_results,
         final_report=final_report,
+        final_report_timed_out=final_report_timed_out,
+        usage=usage or None,
     )
 
 
@@ -168,76 +704,84 @@ async def _stream_single_angle(
     paper_title: str,
     paper_text: str,
     angle_spec: AngleSpec,
+    timeout: float | None = None,
 ) -> None:
     rounds: list[str] = []
     try:
-        prompt = build_angle_prompt(
-            angle_title=angle_spec.title,
-            angle_instruction=angle_spec.prompt,
-            paper_title=paper_title,
-            paper_text=paper_text,
-            user_prompt=options.user_prompt,
-        )
-        final_text = ""
-        streamed_content = False
-        try:
-            async for ev in chat_stream_events(
-                client=client,
-                model=options.model,
-                system_prompt=SYSTEM_PROMPT,
-                user_prompt=prompt,
-                temperature=options.temperature,
-                max_output_tokens=options.max_output_tokens or settings.max_output_tokens,
-                reasoning=reasoning_config(options),
-            ):
-                if ev["type"] == "content":
-                    final_text += ev["text"]
-                    streamed_content = True
-                    await queue.put(
-                        {
-                            "event": "angle_delta",
-                            "angle": angle_spec.title,
-                            "delta": ev["text"],
-                        }
-                    )
-                elif ev["type"] == "reasoning":
-                    await queue.put(
-                        {
-                            "event": "angle_reasoning_delta",
-                            "angle": angle_spec.title,
-                            "delta": ev["text"],
-                        }
-                    )
-        except Exception:
-            final_text = await chat_once(
-                client=client,
-                model=options.model,
-                system_prompt=SYSTEM_PROMPT,
-                user_prompt=prompt,
-                temperature=options.temperature,
-                max_output_tokens=options.max_output_tokens or settings.max_output_tokens,
-                reasoning=reasoning_config(options),
-            )
+        async with asyncio.timeout(timeout):
+            shared_prefix, prompt = angle_prompt_parts(options, paper_title, paper_text, angle_spec)
+            final_text = ""
+            streamed_content = False
+
+            async def report(ev: dict) -> None:
+                if ev["type"] == "usage":
+                    await queue.put({"event": "angle_usage", "angle": angle_spec.title, **usage_fields(ev)})
+                else:
+                    await queue.put(resilience_event("angle", ev, angle=angle_spec.title))
+
+            try:
+                async for ev in chat_stream_events(
+                    client=client,
+                    system_prompt=SYSTEM_PROMPT,
+                    user_prompt=prompt,
+                    shared_prefix=shared_prefix,
+                    include_usage=True,
+                    **llm_call_options(options),
+                ):
+                    if ev["type"] == "content":
+                        final_text += ev["text"]
+                        streamed_content = True
+                        await queue.put(
+                            {
+                                "event": "angle_delta",
+                                "angle": angle_spec.title,
+                                "delta": ev["text"],
+                            }
+                        )
+                    elif ev["type"] == "reasoning":
+                        await queue.put(
+                            {
+                                "event": "angle_reasoning_delta",
+                                "angle": angle_spec.title,
+                                "delta": ev["text"],
+                            }
+                        )
+                    elif ev["type"] in ("retry", "circuit_open", "usage"):
+                        await report(ev)
+            except Exception as exc:
+                if not _should_fallback_to_once(exc, streamed_content):
+                    raise
+                final_text = await chat_once(
+                    client=client,
+                    system_prompt=SYSTEM_PROMPT,
+                    user_prompt=prompt,
+                    shared_prefix=shared_prefix,
+                    on_event=report,
+                    **llm_call_options(options),
+                )
+
+            cleaned = clean_analysis_output(final_text)
+            rounds.append(cleaned)
+            if not streamed_content:
+                await queue.put(
+                    {
+                        "event": "angle_delta",
+                        "angle": angle_spec.title,
+                        "delta": cleaned,
+                    }
+                )
 
-        cleaned = clean_analysis_output(final_text)
-        rounds.append(cleaned)
-        if not streamed_content:
             await queue.put(
                 {
-                    "event": "angle_delta",
+                    "event": "angle_done",
                     "angle": angle_spec.title,
-                    "delta": cleaned,
+                    "rounds": rounds,
+                    "final": rounds[-1] if rounds else "",
                 }
             )
-
-        await queue.put(
-            {
-                "event": "angle_done",
-                "angle": angle_spec.title,
-                "rounds": rounds,
-                "final": rounds[-1] if rounds else "",
-            }
-        )
+    except TimeoutError:
+        incr("analysis.angle_timeouts")
+        await queue.put({"event": "angle_timeout", "angle": angle_spec.title, "timeout_seconds": timeout})
     except Exception as exc:
         await queue.put(
             {
@@ -248,16 +792,264 @@ async def _stream_single_angle(
         )
 
 
+async def _stream_sequential(
+    queue: asyncio.Queue,
+    client,
+    options: AnalyzeOptions,
+    paper_title: str,
+    paper_text: str,
+    angle_specs: list[AngleSpec],
+    angle_map: dict[str, str],
+    usage: dict[str, int],
+    angle_contexts: dict[str, str] | None = None,
+    deadline: Deadline | None = None,
+) -> AsyncIterator[dict]:
+    for index, spec in enumerate(angle_specs):
+        task = asyncio.create_task(
+            _stream_single_angle(
+                queue=queue,
+                client=client,
+                options=options,
+                paper_title=paper_title,
+                paper_text=(angle_contexts or {}).get(spec.title, paper_text),
+                angle_spec=spec,
+                # 逐个运行时每个角度平分剩余时间，慢角度不会挤占后续角度。
+                timeout=angle_timeout(deadline, len(angle_specs) - index),
+            )
+        )
+        angle_finished = False
+        try:
+            while not angle_finished:
+                item = await queue.get()
+                if item["event"] == "angle_usage":
+                    add_usage(usage, item)
+                elif item["event"] == "angle_done" and item["angle"] == spec.title:
+                    angle_map[item["angle"]] = item["final"]
+                    angle_finished = True
+                elif item["event"] in ("angle_error", "angle_timeout") and item["angle"] == spec.title:
+                    angle_finished = True
+                yield item
+            await task
+        finally:
+            cancel_pending([task])
+
+
+async def _stream_pipelined(
+    client,
+    options: AnalyzeOptions,
+    paper_title: str,
+    paper_text: str,
+    angle_specs: list[AngleSpec],
+    angle_map: dict[str, str],
+    usage: dict[str, int],
+    angle_contexts: dict[str, str],
+    deadline: Deadline | None = None,
+) -> AsyncIterator[dict]:
+    """Run up to ``parallel_limit`` angles ahead in the background, emitting each angle's
+    buffered events in order once the angles before it have finished."""
+    semaphore = asyncio.Semaphore(options.parallel_limit)
+    queues: list[asyncio.Queue] = [asyncio.Queue() for _ in angle_specs]
+
+    async def run(index: int, spec: AngleSpec) -> None:
+        # 信号量按 FIFO 唤醒，后续角度按顺序依次启动。
+        async with semaphore:
+            await _stream_single_angle(
+                queue=queues[index],
+                client=client,
+                options=options,
+                paper_title=paper_title,
+                paper_text=angle_contexts.get(spec.title, paper_text),
+                angle_spec=spec,
+                timeout=angle_timeout(deadline),
+            )
+
+    tasks = [asyncio.create_task(run(index, spec)) for index, spec in enumerate(angle_specs)]
+    try:
+        for index, spec in enumerate(angle_specs):
+            while True:
+                item = await queues[index].get()
+                if item["event"] == "angle_usage":
+                    add_usage(usage, item)
+                elif item["event"] == "angle_done":
+                    angle_map[spec.title] = item["final"]
+                yield item
+                if item["event"] in ("angle_done", "angle_error", "angle_timeout"):
+                    break
+            await tasks[index]
+    finally:
+        cancel_pending(tasks)
+
+
+async def _stream_single_call(
+    client,
+    options: AnalyzeOptions,
+    paper_title: str,
+    paper_text: str,
+    angle_specs: list[AngleSpec],
+    angle_map: dict[str, str],
+    usage: dict[str, int],
+    deadline: Deadline | None = None,
+) -> AsyncIterator[dict]:
+    """Stream every angle from one completion, demultiplexed into per-angle events."""
+    titles = [spec.title for spec in angle_specs]
+    prompt = single_call_prompt(options, paper_title, paper_text, angle_specs)
+    call_options = single_call_options(options, len(angle_specs))
+    demuxer = AngleDemuxer(len(angle_specs))
+    sections: dict[int, list[str]] = {}
+    streamed: set[int] = set()
+
+    def to_events(parts: list[tuple[str, int, str]]) -> list[dict]:
+        events = []
+        for kind, index, text in parts:
+            title = titles[index - 1]
+            if kind == "delta":
+                sections.setdefault(index, []).append(text)
+                events.append({"event": "angle_delta", "angle": title, "delta": text})
+            elif kind == "end":
+                final = clean_analysis_output("".join(sections.get(index, [])).strip())
+                if final:
+                    angle_map[title] = final
+                    events.append({"event": "angle_done", "angle": title, "rounds": [final], "final": final})
+        return events
+
+    streamed_content = False
+    timeout = angle_timeout(deadline)
+    try:
+        try:
+            # aclosing：外层生成器被关闭时立即关闭上游流，而不是等垃圾回收。
+            async with aclosing(
+                stream_with_timeout(
+                    chat_stream_events(
+                        client=client,
+                        system_prompt=SYSTEM_PROMPT,
+                        user_prompt=prompt,
+                        include_usage=True,
+                        **call_options,
+                    ),
+                    timeout,
+                )
+            ) as events:
+                async for ev in events:
+                    if ev["type"] == "usage":
+                        # 计入请求用量，用于对比单次调用相对逐角度调用节省的输入 token。
+                        add_usage(usage, ev)
+                    elif ev["type"] == "content":
+                        streamed_content = True
+                        for item in to_events(demuxer.feed(ev["text"])):
+                            yield item
+                    elif ev["type"] == "reasoning":
+                        angle = titles[(demuxer.current or 1) - 1]
+                        yield {"event": "angle_reasoning_delta", "angle": angle, "delta": ev["text"]}
+                    elif ev["type"] in ("retry", "circuit_open"):
+                        yield resilience_event("angle", ev, angle=titles[(demuxer.current or 1) - 1])
+            for item in to_events(demuxer.close()):
+                yield item
+        except TimeoutError:
+            raise
+        except Exception as exc:
+            if not _should_fallback_to_once(exc, streamed_content):
+                raise
+            streamed = set(sections)
+            retry_events: list[dict] = []
+
+            async def report(ev: dict) -> None:
+                if ev["type"] == "usage":
+                    add_usage(usage, ev)
+                else:
+                    retry_events.append(resilience_event("angle", ev, angle=titles[0]))
+
+            async with asyncio.timeout(angle_timeout(deadline)):
+                text = await chat_once(
+                    client=client,
+                    system_prompt=SYSTEM_PROMPT,
+                    user_prompt=prompt,
+                    on_event=report,
+                    **call_options,
+                )
+            for item in retry_events:
+                yield item
+            for index, section in split_angle_sections(text, len(angle_specs)).items():
+                title = titles[index - 1]
+                final = clean_analysis_output(section.strip())
+                if title in angle_map or not final:
+                    continue
+                angle_map[title] = final
+                if index not in streamed:
+                    yield {"event": "angle_delta", "angle": title, "delta": final}
+                yield {"event": "angle_done", "angle": title, "rounds": [final], "final": final}
+    except TimeoutError:
+        for title in titles:
+            if title not in angle_map:
+                incr("analysis.angle_timeouts")
+                yield {"event": "angle_timeout", "angle": title, "timeout_seconds": timeout}
+    except Exception as exc:
+        for title in titles:
+            if title not in angle_map:
+                yield {"event": "angle_error", "angle": title, "message": str(exc)}
+
+
 async def analyze_paper_stream(
     options: AnalyzeOptions,
     paper_text: str,
     paper_title: str,
+    extraction: dict | None = None,
+    deadline: Deadline | None = None,
+) -> AsyncIterator[dict]:
+    """Stream analysis events; closing the generator cancels every background call it started."""
+    background: list[asyncio.Task] = []
+    if deadline is None:
+        deadline = start_deadline(options.deadline_seconds, options.enable_final_report)
+    events = _analyze_paper_stream(options, paper_text, paper_title, extraction, background, deadline)
+    try:
+        async for item in events:
+            yield item
+    finally:
+        # 先同步取消，再等待收尾；即使等待被打断，取消也已生效。
+        pending = cancel_pending(background)
+        await events.aclose()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _analyze_paper_stream(
+    options: AnalyzeOptions,
+    paper_text: str,
+    paper_title: str,
+    extraction: dict | None,
+    background: list[asyncio.Task],
+    deadline: Deadline | None,
 ) -> AsyncIterator[dict]:
-    clipped_text = clamp_text(paper_text, resolve_max_input_chars(options))
     angle_specs = pick_angle_specs(options)
+    clipped_text, token_estimate = fit_paper_text(options, paper_title, paper_text, angle_specs)
     angle_titles = [spec.title for spec in angle_specs]
+    map_plan = None
+    if options.context_mode == "map_reduce" and len(clipped_text) < len(paper_text) and not options.mock_mode:
+        map_plan = plan_map_chunks(options, paper_text, token_estimate["input_budget_tokens"])
+    angle_contexts: dict[str, str] = {}
+    retrieval_stats = None
+    if _uses_retrieval(options, paper_text, clipped_text):
+        angle_contexts, retrieval_stats = await asyncio.to_thread(
+            retrieve_angle_contexts, options, paper_text, angle_specs, token_estimate["input_budget_tokens"]
+        )
+    meta = {
+        "event": "meta",
+        "paper_title": paper_title,
+        "angles": angle_titles,
+        "stream_mode": options.stream_mode,
+        "context_mode": options.context_mode,
+        "page_count": (extraction or {}).get("page_count"),
+        "pages_parsed": (extraction or {}).get("pages_parsed"),
+        "text_truncated": bool((extraction or {}).get("truncated")) or map_plan["chunks_dropped"] > 0
+        if map_plan
+        else _is_truncated(paper_text, clipped_text, extraction),
+        "token_estimate": token_estimate,
+        "sections": paper_sections(extraction),
+        "normalization": (extraction or {}).get("normalization"),
+    }
+    if retrieval_stats:
+        meta["retrieval"] = retrieval_stats
     if options.mock_mode:
-        yield {"event": "meta", "paper_title": paper_title, "angles": angle_titles, "stream_mode": options.stream_mode}
+        yield meta
         angle_map: dict[str, str] = {}
         for spec in angle_specs:
             msg = _mock_text(spec.title, paper_title)
@@ -279,16 +1071,43 @@ async def analyze_paper_stream(
         }
         return
 
-    client = build_client(options.api_key, str(options.base_url))
-    yield {
-        "event": "meta",
-        "paper_title": paper_title,
-        "angles": angle_titles,
-        "stream_mode": options.stream_mode,
-    }
+    client = get_client(options.api_key, str(options.base_url))
+    yield meta
 
     angle_map: dict[str, str] = {}
+    usage: dict[str, int] = {}
     queue: asyncio.Queue = asyncio.Queue()
+    timed_out: list[str] = []
+
+    def track(item: dict) -> dict:
+        if item["event"] == "angle_timeout":
+            timed_out.append(item["angle"])
+        return item
+
+    if map_plan or _uses_digest(options, token_estimate):
+        stage = "map" if map_plan else "digest"
+        if map_plan:
+            preprocess = _map_paper(client, options, paper_title, map_plan, angle_specs, usage, queue.put)
+        else:
+            preprocess = _condense_paper(client, options, paper_title, paper_text, clipped_text, usage, queue.put)
+        # 预处理最多占用角度阶段的一半时间，超时或失败则退回原文节选。
+        preprocess_task = asyncio.create_task(asyncio.wait_for(preprocess, angle_timeout(deadline, 2)))
+        background.append(preprocess_task)
+        async for item in _drain_events(queue, preprocess_task):
+            yield item
+        try:
+            condensed = preprocess_task.result()
+        except TimeoutError:
+            incr("analysis.preprocess_timeouts")
+            yield {"event": "preprocess_timeout", "stage": stage}
+        except Exception as exc:
+            incr("analysis.preprocess_errors")
+            yield {"event": "preprocess_error", "stage": stage, "message": str(exc)}
+        else:
+            if map_plan:
+                clipped_text, _ = fit_paper_text(options, paper_title, condensed, angle_specs)
+            else:
+                clipped_text = condensed
 
     if options.stream_mode == "parallel":
         semaphore = asyncio.Semaphore(options.parallel_limit)
@@ -300,75 +1119,132 @@ async def analyze_paper_stream(
                     client=client,
                     options=options,
                     paper_title=paper_title,
-                    paper_text=clipped_text,
+                    paper_text=angle_contexts.get(spec.title, clipped_text),
                     angle_spec=spec,
+                    timeout=angle_timeout(deadline),
                 )
 
         tasks = [asyncio.create_task(run_with_limit(spec)) for spec in angle_specs]
+        background.extend(tasks)
         done_count = 0
         while done_count < len(tasks):
             item = await queue.get()
-            if item["event"] == "angle_done":
+            if item["event"] == "angle_usage":
+                add_usage(usage, item)
+            elif item["event"] == "angle_done":
                 angle_map[item["angle"]] = item["final"]
                 done_count += 1
-            elif item["event"] == "angle_error":
+            elif item["event"] in ("angle_error", "angle_timeout"):
                 done_count += 1
-            yield item
+            yield track(item)
         await asyncio.gather(*tasks, return_exceptions=True)
-    else:
-        for spec in angle_specs:
-            task = asyncio.create_task(
-                _stream_single_angle(
-                    queue=queue,
-                    client=client,
-                    options=options,
-                    paper_title=paper_title,
-                    paper_text=clipped_text,
-                    angle_spec=spec,
+    elif options.stream_mode == "pipelined":
+        async with aclosing(
+            _stream_pipelined(
+                client, options, paper_title, clipped_text, angle_specs, angle_map, usage, angle_contexts, deadline
+            )
+        ) as events:
+            async for item in events:
+                yield track(item)
+    elif options.stream_mode == "single_call":
+        failed: set[str] = set()
+        async with aclosing(
+            _stream_single_call(client, options, paper_title, clipped_text, angle_specs, angle_map, usage, deadline)
+        ) as events:
+            async for item in events:
+                if item["event"] in ("angle_error", "angle_timeout"):
+                    failed.add(item["angle"])
+                yield track(item)
+        # 模型漏掉的角度逐个补一次调用；调用本身失败或超时的角度已报告，不再重试。
+        missing = [spec for spec in angle_specs if spec.title not in angle_map and spec.title not in failed]
+        if missing:
+            async with aclosing(
+                _stream_sequential(
+                    queue, client, options, paper_title, clipped_text, missing, angle_map, usage, deadline=deadline
                 )
+            ) as events:
+                async for item in events:
+                    yield track(item)
+    else:
+        async with aclosing(
+            _stream_sequential(
+                queue,
+                client,
+                options,
+                paper_title,
+                clipped_text,
+                angle_specs,
+                angle_map,
+                usage,
+                angle_contexts,
+                deadline,
             )
-            angle_finished = False
-            while not angle_finished:
-                item = await queue.get()
-                if item["event"] == "angle_done" and item["angle"] == spec.title:
-                    angle_map[item["angle"]] = item["final"]
-                    angle_finished = True
-                elif item["event"] == "angle_error" and item["angle"] == spec.title:
-                    angle_finished = True
-                yield item
-            await task
+        ) as events:
+            async for item in events:
+                yield track(item)
 
-    if options.enable_final_report:
+    final_timed_out = False
+    # 没有任何角度完成时不生成最终报告；超时的角度不进入最终报告。
+    if options.enable_final_report and angle_map:
         final_prompt = build_final_summary_prompt(angle_map)
         final_report = ""
         yield {"event": "final_start"}
         streamed_content = False
+        final_timeout = deadline.remaining() if deadline else None
         try:
-            async for ev in chat_stream_events(
-                client=client,
-                model=options.model,
-                system_prompt=SYSTEM_PROMPT,
-                user_prompt=final_prompt,
-                temperature=options.temperature,
-                max_output_tokens=options.max_output_tokens or settings.max_output_tokens,
-                reasoning=reasoning_config(options),
-            ):
-                if ev["type"] == "content":
-                    final_report += ev["text"]
-                    streamed_content = True
-                    yield {"event": "final_delta", "delta": ev["text"]}
-                elif ev["type"] == "reasoning":
-                    yield {"event": "final_reasoning_delta", "delta": ev["text"]}
-        except Exception:
-            final_report = await chat_once(
-                client=client,
-                model=options.model,
-                system_prompt=SYSTEM_PROMPT,
-                user_prompt=final_prompt,
-                temperature=options.temperature,
-                max_output_tokens=options.max_output_tokens or settings.max_output_tokens,
-                reasoning=reasoning_config(options),
-            )
+            try:
+                async with aclosing(
+                    stream_with_timeout(
+                        chat_stream_events(
+                            client=client,
+                            system_prompt=SYSTEM_PROMPT,
+                            user_prompt=final_prompt,
+                            include_usage=True,
+                            **llm_call_options(options),
+                        ),
+                        final_timeout,
+                    )
+                ) as events:
+                    async for ev in events:
+                        if ev["type"] == "content":
+                            final_report += ev["text"]
+                            streamed_content = True
+                            yield {"event": "final_delta", "delta": ev["text"]}
+                        elif ev["type"] == "reasoning":
+                            yield {"event": "final_reasoning_delta", "delta": ev["text"]}
+                        elif ev["type"] == "usage":
+                            # 最终报告通常是最大的一次调用，计入 final_done 的用量合计。
+                            add_usage(usage, ev)
+                        elif ev["type"] in ("retry", "circuit_open"):
+                            yield resilience_event("final", ev)
+            except TimeoutError:
+                raise
+            except Exception as exc:
+                if not _should_fallback_to_once(exc, streamed_content):
+                    raise
+                retry_events: list[dict] = []
+
+                async def report(ev: dict) -> None:
+                    if ev["type"] == "usage":
+                        add_usage(usage, ev)
+                    else:
+                        retry_events.append(resilience_event("final", ev))
+
+                async with asyncio.timeout(deadline.remaining() if deadline else None):
+                    final_report = await chat_once(
+                        client=client,
+                        system_prompt=SYSTEM_PROMPT,
+                        user_prompt=final_prompt,
+                        on_event=report,
+                        **llm_call_options(options),
+                    )
+                for item in retry_events:
+                    yield item
+        except TimeoutError:
+            # 已流出的部分报告保留在 final_report 中。
+            incr("analysis.final_timeouts")
+            final_timed_out = True
+            yield {"event": "final_timeout", "timeout_seconds": final_timeout}
         final_report = clean_analysis_output(final_report)
         if not streamed_content:
             yield {"event": "final_delta", "delta": final_report}
@@ -382,4 +1258,7 @@ async def analyze_paper_stream(
         "text_char_count": len(clipped_text),
         "model": options.model,
         "base_url": str(options.base_url),
+        "timed_out_angles": timed_out,
+        "final_timed_out": final_timed_out,
+        "usage": usage or None,
     }
@@ -0,0 +1,95 @@
+# app/angle_demux.py
+
+"""
+单次调用多角度输出的分段解析
+"""
+
+import re
+
+_MARKER_OPEN = "<<<"
+_MARKER_CLOSE = ">>>"
+_MARKER_RE = re.compile(r"^\s*(?:ANGLE\s+(\d+)|(END))\s*$")
+# 超过该长度仍未闭合的 "<<<" 视为正文。
+_MAX_MARKER_LEN = 24
+
+
+class AngleDemuxer:
+    """Split a ``<<<ANGLE n>>>``/``<<<END>>>`` delimited stream incrementally.
+
+    ``feed`` returns ``("start", n, "")``, ``("delta", n, text)`` and
+    ``("end", n, "")`` tuples, with ``n`` 1-based. Markers may be split across
+    chunks; text outside any section is dropped.
+    """
+
+    def __init__(self, angle_count: int):
+        self.angle_count = angle_count
+        self.current: int | None = None
+        self.seen: set[int] = set()
+        self._buffer = ""
+        self._at_section_start = False
+
+    def feed(self, chunk: str) -> list[tuple[str, int, str]]:
+        self._buffer += chunk
+        out: list[tuple[str, int, str]] = []
+        while self._buffer:
+            pos = self._buffer.find(_MARKER_OPEN)
+            if pos < 0:
+                # 末尾可能是被截断的 "<" / "<<"，留到下个分块再判断。
+                keep = len(self._buffer) - len(self._buffer.rstrip("<"))
+                keep = min(keep, len(_MARKER_OPEN) - 1)
+                self._emit(self._buffer[: len(self._buffer) - keep], out)
+                self._buffer = self._buffer[len(self._buffer) - keep :]
+                break
+            close = self._buffer.find(_MARKER_CLOSE, pos + len(_MARKER_OPEN))
+            if close < 0:
+                if len(self._buffer) - pos > _MAX_MARKER_LEN:
+                    self._emit(self._buffer[: pos + len(_MARKER_OPEN)], out)
+                    self._buffer = self._buffer[pos + len(_MARKER_OPEN) :]
+                    continue
+                self._emit(self._buffer[:pos], out)
+                self._buffer = self._buffer[pos:]
+                break
+            match = _MARKER_RE.match(self._buffer[pos + len(_MARKER_OPEN) : close])
+            if match is None:
+                self._emit(self._buffer[: close + len(_MARKER_CLOSE)], out)
+            else:
+                self._emit(self._buffer[:pos], out)
+                self._switch(int(match.group(1)) if match.group(1) else None, out)
+            self._buffer = self._buffer[close + len(_MARKER_CLOSE) :]
+        return out
+
+    def close(self) -> list[tuple[str, int, str]]:
+        out: list[tuple[str, int, str]] = []
+        self._emit(self._buffer, out)
+        self._buffer = ""
+        self._switch(None, out)
+        return out
+
+    def _switch(self, index: int | None, out: list[tuple[str, int, str]]) -> None:
+        if self.current is not None:
+            out.append(("end", self.current, ""))
+            self.current = None
+        if index is not None and 1 <= index <= self.angle_count and index not in self.seen:
+            self.seen.add(index)
+            self.current = index
+            self._at_section_start = True
+            out.append(("start", index, ""))
+
+    def _emit(self, text: str, out: list[tuple[str, int, str]]) -> None:
+        if self.current is None or not text:
+            return
+        if self._at_section_start:
+            text = text.lstrip()
+            if not text:
+                return
+            self._at_section_start = False
+        out.append(("delta", self.current, text))
+
+
+def split_angle_sections(text: str, angle_count: int) -> dict[int, str]:
+    demuxer = AngleDemuxer(angle_count)
+    sections: dict[int, list[str]] = {}
+    for kind, index, delta in demuxer.feed(text) + demuxer.close():
+        if kind == "delta":
+            sections.setdefault(index, []).append(delta)
+    return {index: "".join(parts) for index, parts in sections.items()}
@@ -0,0 +1,142 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+
+from app.analyzer import analyze_paper_stream, cancel_pending, extraction_char_budget
+from app.config import settings
+from app.deadline import start_deadline
+from app.extraction_engine import extract_pdf
+from app.scheduler import work_scope
+from app.schemas import AnalyzeOptions, AngleResult, PaperAnalysisResponse
+from app.singleflight import flight_key, join_stream
+
+ANGLE_STATUS = {"angle_done": "done", "angle_error": "error", "angle_timeout": "timeout"}
+
+
+def _collect_result(meta: dict, angles: dict[str, AngleResult], final: dict) -> PaperAnalysisResponse:
+    return PaperAnalysisResponse(
+        paper_title=meta["paper_title"],
+        model=final["model"],
+        base_url=final["base_url"],
+        text_char_count=final["text_char_count"],
+        page_count=meta.get("page_count"),
+        text_truncated=meta.get("text_truncated", False),
+        angles=[angles[title] for title in meta["angles"] if title in angles],
+        final_report=final["final_report"],
+        final_report_timed_out=final.get("final_timed_out", False),
+        usage=final.get("usage"),
+    )
+
+
+async def _analyze_one(
+    index: int,
+    filename: str,
+    spooled: dict | None,
+    options: AnalyzeOptions,
+    request_id: str,
+    resident: asyncio.Semaphore,
+    emit,
+) -> None:
+    base = {"index": index, "filename": filename}
+    if spooled is None:
+        await emit({"event": "paper_error", **base, "error": "仅支持 PDF 文件。"})
+        return
+    try:
+        async with resident:
+            await emit({"event": "paper_started", **base})
+            deadline = start_deadline(options.deadline_seconds, options.enable_final_report)
+            extraction = await extract_pdf(
+                spooled["path"],
+                max_chars=extraction_char_budget(options),
+                sha256=spooled["sha256"],
+                timeout_seconds=deadline.extraction_timeout() if deadline else None,
+            )
+        text = extraction["text"]
+        if not text:
+            await emit({"event": "paper_error", **base, "error": "PDF 未提取到有效文本，请检查文档内容。"})
+            return
+        paper_title = extraction["title"] or filename
+        with work_scope(request_id):
+            events = join_stream(
+                flight_key("stream", spooled["sha256"], paper_title, options),
+                lambda: analyze_paper_stream(
+                    options=options,
+                    paper_text=text,
+                    paper_title=paper_title,
+                    extraction=extraction,
+                    deadline=deadline,
+                ),
+            )
+        meta: dict = {}
+        angles: dict[str, AngleResult] = {}
+        errors: dict[str, str] = {}
+        final: dict | None = None
+        # 只转发角度完成/失败等进度，逐字增量不下发；共享流的回放缓冲会把已结束角度的增量合并为一条。
+        async with aclosing(events):
+            async for item in events:
+                kind = item["event"]
+                if kind == "meta":
+                    meta = item
+                elif kind in ANGLE_STATUS:
+                    angle = item["angle"]
+                    if kind == "angle_done":
+                        angles[angle] = AngleResult(angle=angle, rounds=item["rounds"], final=item["final"])
+                    elif kind == "angle_timeout":
+                        angles[angle] = AngleResult(angle=angle, rounds=[], final="", timed_out=True)
+                    else:
+                        errors[angle] = item["message"]
+                    await emit(
+                        {
+                            "event": "angle_progress",
+                            **base,
+                            "angle": angle,
+                            "status": ANGLE_STATUS[kind],
+                            "finished": len(angles) + len(errors),
+                            "total": len(meta.get("angles", [])),
+                        }
+                    )
+                elif kind == "final_done":
+                    final = item
+        if final is None:
+            raise RuntimeError("分析未正常结束")
+        done = {"event": "paper_done", **base, "result": _collect_result(meta, angles, final).model_dump()}
+        if errors:
+            done["angle_errors"] = errors
+        await emit(done)
+    except Exception as exc:
+        await emit({"event": "paper_error", **base, "error": str(exc)})
+
+
+async def stream_batch(
+    options: AnalyzeOptions,
+    uploads: list[tuple[str, dict | None]],
+    request_id: str,
+) -> AsyncIterator[dict]:
+    """Analyze ``uploads`` (filename, spooled file or ``None`` for a rejected file) concurrently
+    and yield per-paper events as they happen.
+
+    Each paper ends with exactly one ``paper_done`` or ``paper_error``; its
+    result is dropped as soon as that event is yielded.
+    """
+    # 有界队列：客户端读得慢时各论文的事件先在生产端等待，而不是在内存里堆积。
+    queue: asyncio.Queue = asyncio.Queue(maxsize=settings.batch_stream_queue_size)
+    resident = asyncio.Semaphore(settings.batch_resident_files)
+    yield {"event": "batch_start", "total": len(uploads)}
+    tasks = [
+        asyncio.create_task(_analyze_one(index, filename, spooled, options, request_id, resident, queue.put))
+        for index, (filename, spooled) in enumerate(uploads)
+    ]
+    succeeded = failed = 0
+    try:
+        while succeeded + failed < len(tasks):
+            item = await queue.get()
+            if item["event"] == "paper_done":
+                succeeded += 1
+            elif item["event"] == "paper_error":
+                failed += 1
+            yield item
+    finally:
+        pending = cancel_pending(tasks)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    yield {"event": "batch_done", "total": len(tasks), "succeeded": succeeded, "failed": failed}
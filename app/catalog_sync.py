@@ -33,6 +33,49 @@ def _extract_models(payload: dict) -> list[str]:
     return uniq
 
 
+def _positive_int(value) -> int | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)) and value > 0:
+        return int(value)
+    if isinstance(value, str) and value.isdigit() and int(value) > 0:
+        return int(value)
+    return None
+
+
+def _extract_model_limits(payload: dict) -> dict[str, dict[str, int]]:
+    """Per-model ``context_length``/``max_completion_tokens`` from a ``/models`` payload."""
+    data = payload.get("data")
+    if not isinstance(data, list):
+        return {}
+    limits: dict[str, dict[str, int]] = {}
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        model_id = item.get("id") or item.get("model") or item.get("name")
+        if not isinstance(model_id, str) or not model_id.strip():
+            continue
+        top = item.get("top_provider") if isinstance(item.get("top_provider"), dict) else {}
+        # 各家字段名不一：OpenRouter 用 context_length/top_provider，Groq 用 context_window，vLLM 用 max_model_len。
+        context_length = (
+            _positive_int(top.get("context_length"))
+            or _positive_int(item.get("context_length"))
+            or _positive_int(item.get("context_window"))
+            or _positive_int(item.get("max_model_len"))
+        )
+        max_completion = _positive_int(top.get("max_completion_tokens")) or _positive_int(
+            item.get("max_completion_tokens")
+        )
+        entry = {}
+        if context_length:
+            entry["context_length"] = context_length
+        if max_completion:
+            entry["max_completion_tokens"] = max_completion
+        if entry:
+            limits[model_id.strip()] = entry
+    return limits
+
+
 async def _fetch_models(
     provider: str,
     url: str,
@@ -49,6 +92,7 @@ async def _fetch_models(
             resp.raise_for_status()
             payload = resp.json()
         models = _extract_models(payload)
+        limits = _extract_model_limits(payload)
         if not models:
             return {
                 "provider": provider,
@@ -62,6 +106,7 @@ async def _fetch_models(
             "provider": provider,
             "ok": True,
             "models": models,
+            "limits": limits,
             "source": url,
             "updated_at": _now_iso(),
             "error": None,
@@ -0,0 +1,75 @@
+# app/chunking.py
+
+"""
+论文正文分块
+"""
+
+import re
+
+from app.tokenizer import clip_to_tokens, count_tokens
+
+_BLANK_LINES_RE = re.compile(r"\n\s*\n")
+
+
+def _split_long(text: str, max_tokens: int, model: str | None) -> list[str]:
+    # 超长段落先按行聚合，单行仍超长时硬切。
+    pieces: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+    for line in text.split("\n"):
+        tokens = count_tokens(line, model)
+        while tokens > max_tokens:
+            head = clip_to_tokens(line, max_tokens, model) or line[:1]
+            if current:
+                pieces.append("\n".join(current))
+                current, current_tokens = [], 0
+            pieces.append(head)
+            line = line[len(head) :]
+            tokens = count_tokens(line, model)
+        if current and current_tokens + tokens > max_tokens:
+            pieces.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += tokens
+    if current:
+        pieces.append("\n".join(current))
+    return [piece for piece in pieces if piece.strip()]
+
+
+def split_paragraphs(text: str, max_tokens: int, model: str | None = None) -> list[str]:
+    """Blank-line separated paragraphs, with any paragraph over ``max_tokens`` split further."""
+    paragraphs: list[str] = []
+    for raw in _BLANK_LINES_RE.split(text):
+        paragraph = raw.strip()
+        if not paragraph:
+            continue
+        if count_tokens(paragraph, model) > max_tokens:
+            paragraphs.extend(_split_long(paragraph, max_tokens, model))
+        else:
+            paragraphs.append(paragraph)
+    return paragraphs
+
+
+def chunk_text(text: str, max_tokens: int, overlap_tokens: int = 0, model: str | None = None) -> list[str]:
+    """Pack paragraphs into chunks of at most ``max_tokens``; consecutive chunks share
+    up to ``overlap_tokens`` of trailing paragraphs so facts on a boundary are not lost."""
+    chunks: list[str] = []
+    current: list[tuple[str, int]] = []
+    current_tokens = 0
+    for paragraph in split_paragraphs(text, max_tokens, model):
+        tokens = count_tokens(paragraph, model)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n\n".join(part for part, _ in current))
+            carry: list[tuple[str, int]] = []
+            carry_tokens = 0
+            for part, part_tokens in reversed(current):
+                if carry_tokens + part_tokens > overlap_tokens or carry_tokens + part_tokens + tokens > max_tokens:
+                    break
+                carry.insert(0, (part, part_tokens))
+                carry_tokens += part_tokens
+            current, current_tokens = carry, carry_tokens
+        current.append((paragraph, tokens))
+        current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(part for part, _ in current))
+    return chunks
@@ -0,0 +1,173 @@
+import asyncio
+import itertools
+import time
+from collections import Counter
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import httpx
+from openai import APIStatusError, APITimeoutError, RateLimitError
+
+from app.config import settings
+from app.scheduler import WorkTag, current_work
+
+OVERLOAD_STATUS_CODES = {429, 503, 529}
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    if isinstance(exc, (RateLimitError, APITimeoutError, asyncio.TimeoutError, httpx.TimeoutException)):
+        return True
+    return isinstance(exc, APIStatusError) and exc.status_code in OVERLOAD_STATUS_CODES
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for one provider.
+
+    Each success raises the limit by 1/limit (about +1 per window of calls).
+    A 429, overload status, timeout, or time-to-first-token above
+    ``adaptive_latency_factor`` x the running baseline multiplies it by
+    ``adaptive_backoff_factor``, at most once per cooldown period.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.limit = float(settings.adaptive_initial_concurrency)
+        self.in_flight = 0
+        self.latency_baseline: float | None = None
+        # (future, tag, arrival)：空出名额时按 _priority 挑选，而不是先到先得。
+        self._waiters: list[tuple[asyncio.Future, WorkTag | None, int]] = []
+        self._arrivals = itertools.count()
+        self._request_in_flight: Counter[str | None] = Counter()
+        self._last_decrease = 0.0
+        self.stats = {"acquired": 0, "overloads": 0, "slow": 0, "errors": 0}
+
+    def _capacity(self) -> int:
+        return max(settings.adaptive_min_concurrency, int(self.limit))
+
+    def _priority(self, entry: tuple[asyncio.Future, WorkTag | None, int]) -> tuple[int, int, int]:
+        # 先照顾占用名额最少的请求（请求间公平），再优先已开始得最早的论文（让首批结果尽早完成），最后按到达顺序。
+        # 未标记的调用（如连通性检查）视为最早开始。
+        _, tag, arrival = entry
+        if tag is None:
+            return self._request_in_flight[None], 0, arrival
+        return self._request_in_flight[tag.request], tag.paper, arrival
+
+    def _grant(self, tag: WorkTag | None) -> None:
+        self.in_flight += 1
+        self._request_in_flight[tag.request if tag else None] += 1
+
+    def _return(self, tag: WorkTag | None) -> None:
+        self.in_flight -= 1
+        request = tag.request if tag else None
+        self._request_in_flight[request] -= 1
+        if self._request_in_flight[request] <= 0:
+            del self._request_in_flight[request]
+
+    async def acquire(self, tag: WorkTag | None = None) -> None:
+        if not self._waiters and self.in_flight < self._capacity():
+            self._grant(tag)
+            self.stats["acquired"] += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (waiter, tag, next(self._arrivals))
+        self._waiters.append(entry)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 已被分配名额但调用方取消，归还名额。
+                self._return(tag)
+                self._wake()
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+            raise
+        self.stats["acquired"] += 1
+
+    def release(self, outcome: str, latency: float | None = None, tag: WorkTag | None = None) -> None:
+        self._return(tag)
+        self._adjust(outcome, latency)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < self._capacity():
+            entry = min(self._waiters, key=self._priority)
+            self._waiters.remove(entry)
+            waiter, tag, _ = entry
+            if waiter.done():
+                continue
+            self._grant(tag)
+            waiter.set_result(None)
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < settings.adaptive_decrease_cooldown_seconds:
+            return
+        self._last_decrease = now
+        self.limit = max(float(settings.adaptive_min_concurrency), self.limit * settings.adaptive_backoff_factor)
+
+    def _adjust(self, outcome: str, latency: float | None) -> None:
+        if outcome == "overload":
+            self.stats["overloads"] += 1
+            self._decrease()
+            return
+        if outcome != "ok":
+            if outcome == "error":
+                self.stats["errors"] += 1
+            return
+
+        if latency is not None:
+            baseline = self.latency_baseline
+            if baseline is not None and latency > baseline * settings.adaptive_latency_factor:
+                self.stats["slow"] += 1
+                self._decrease()
+                return
+            self.latency_baseline = latency if baseline is None else baseline * 0.8 + latency * 0.2
+        self.limit = min(float(settings.adaptive_max_concurrency), self.limit + 1.0 / self.limit)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[dict]:
+        """Hold one slot; set ``handle["latency"]`` to report time-to-first-token.
+
+        The slot is tagged with the caller's ``work_scope`` so waiters are
+        ordered fairly across requests and papers.
+        """
+        tag = current_work()
+        await self.acquire(tag)
+        handle: dict = {"latency": None}
+        outcome = "ok"
+        try:
+            yield handle
+        except (asyncio.CancelledError, GeneratorExit):
+            outcome = "cancelled"
+            raise
+        except BaseException as exc:
+            outcome = "overload" if is_overload_error(exc) else "error"
+            raise
+        finally:
+            self.release(outcome, handle["latency"], tag)
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "capacity": self._capacity(),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "active_requests": sum(1 for request in self._request_in_flight if request is not None),
+            "latency_baseline": round(self.latency_baseline, 3) if self.latency_baseline is not None else None,
+            **self.stats,
+        }
+
+
+_limiters: dict[str, AdaptiveLimiter] = {}
+
+
+def get_limiter(fingerprint: str) -> AdaptiveLimiter:
+    limiter = _limiters.get(fingerprint)
+    if limiter is None:
+        limiter = AdaptiveLimiter(fingerprint)
+        _limiters[fingerprint] = limiter
+    return limiter
+
+
+def limiter_status() -> dict:
+    return {name: limiter.snapshot() for name, limiter in _limiters.items()}
@@ -7,13 +7,69 @@ class Settings(BaseSettings):
     max_pdf_chars: int = 30000
     max_analysis_angles: int = 8
     max_output_tokens: int = 1800
+    single_call_max_output_tokens: int = 8000
+    default_context_tokens: int = 32768
+    auto_max_output_tokens: int = 8192
+    max_auto_input_chars: int = 1_000_000
+    context_safety_tokens: int = 512
+    min_input_tokens: int = 1024
+    map_chunk_tokens: int = 6000
+    map_chunk_overlap_tokens: int = 200
+    map_max_chunks: int = 24
+    map_output_tokens: int = 800
+    retrieval_chunk_tokens: int = 400
+    retrieval_top_k: int = 16
+    digest_output_tokens: int = 3000
+    digest_min_paper_tokens: int = 4000
     default_temperature: float = 0.2
+    deadline_extraction_share: float = 0.2
+    deadline_final_share: float = 0.25
+    llm_client_cache_size: int = 32
+    llm_client_close_grace_seconds: float = 300.0
+    llm_pool_max_connections: int = 100
+    llm_pool_max_keepalive: int = 20
+    llm_pool_keepalive_seconds: float = 60.0
+    adaptive_initial_concurrency: int = 4
+    adaptive_min_concurrency: int = 1
+    adaptive_max_concurrency: int = 32
+    adaptive_backoff_factor: float = 0.5
+    adaptive_latency_factor: float = 3.0
+    adaptive_decrease_cooldown_seconds: float = 2.0
+    llm_max_retries: int = 3
+    llm_retry_base_seconds: float = 0.5
+    llm_retry_max_seconds: float = 20.0
+    circuit_failure_threshold: int = 5
+    circuit_cooldown_seconds: float = 30.0
+    # 例：{"openrouter.ai": {"rpm": 60, "tpm": 200000}}，按 base_url 主机名匹配（含子域名）。
+    provider_rate_limits: dict[str, dict[str, float]] = {}
+    llm_cache_enabled: bool = True
+    llm_cache_ttl_seconds: int = 7 * 24 * 3600
+    llm_cache_max_bytes: int = 256 * 1024 * 1024
+    llm_cache_replay_chunk_chars: int = 24
     app_port: int = 43117
     app_reload: bool = False
     catalog_sync_enabled: bool = True
     catalog_sync_on_startup: bool = True
     catalog_sync_interval_seconds: int = 21600
     catalog_sync_timeout_seconds: float = 20.0
+    extraction_workers: int = 0
+    extraction_queue_size: int = 64
+    extraction_timeout_seconds: float = 120.0
+    extraction_parallel_page_threshold: int = 200
+    extraction_pages_per_task: int = 50
+    upload_spool_dir: str = ""
+    upload_chunk_bytes: int = 1024 * 1024
+    batch_resident_files: int = 4
+    batch_stream_queue_size: int = 64
+    sse_disconnect_poll_seconds: float = 1.0
+    singleflight_enabled: bool = True
+    job_workers: int = 2
+    job_dir: str = "data/jobs"
+    text_normalization_enabled: bool = True
+    strip_references: bool = True
+    extraction_cache_enabled: bool = True
+    extraction_cache_memory_bytes: int = 64 * 1024 * 1024
+    extraction_cache_disk_enabled: bool = True
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -0,0 +1,55 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator
+
+from app.config import settings
+
+
+class Deadline:
+    """Request-level time budget shared by extraction, angle analysis and the final report.
+
+    Extraction gets at most ``deadline_extraction_share`` of the budget; the last
+    ``deadline_final_share`` is reserved for the final report, and the angles
+    (plus map/digest preprocessing) run in whatever lies between.
+    """
+
+    def __init__(self, seconds: float, enable_final_report: bool = True):
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self.final_reserve = seconds * settings.deadline_final_share if enable_final_report else 0.0
+
+    def remaining(self) -> float:
+        return round(max(0.0, self.started + self.seconds - time.monotonic()), 3)
+
+    def extraction_timeout(self) -> float:
+        return min(settings.extraction_timeout_seconds, self.seconds * settings.deadline_extraction_share)
+
+    def angle_slice(self, parts: int = 1) -> float:
+        """Seconds for the next of ``parts`` equal slices of what is left of the angle phase."""
+        return round(max(0.0, self.remaining() - self.final_reserve) / max(1, parts), 3)
+
+
+def start_deadline(seconds: float | None, enable_final_report: bool = True) -> Deadline | None:
+    return Deadline(seconds, enable_final_report) if seconds else None
+
+
+async def stream_with_timeout(events: AsyncIterator, timeout: float | None) -> AsyncIterator:
+    """Yield from ``events`` until ``timeout`` seconds have passed, then close it and raise ``TimeoutError``.
+
+    ``asyncio.timeout`` cannot span the ``yield`` of a generator, so each step is
+    awaited with its own ``wait_for`` against the shared end time.
+    """
+    try:
+        if timeout is None:
+            async for item in events:
+                yield item
+            return
+        end = time.monotonic() + timeout
+        while True:
+            try:
+                item = await asyncio.wait_for(anext(events), max(0.0, end - time.monotonic()))
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        await events.aclose()
@@ -0,0 +1,117 @@
+import hashlib
+import sqlite3
+import time
+
+from app.response_cache import DB_PATH
+
+_stats = {"hits": 0, "misses": 0, "writes": 0}
+_initialized = False
+
+
+def init_digests() -> None:
+    global _initialized
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with sqlite3.connect(DB_PATH) as conn:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(paper_digests)")}
+        if columns and "base_url" not in columns:
+            # 旧表的主键不含 base_url；摘要可以重新生成，直接重建。
+            conn.execute("DROP TABLE paper_digests")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS paper_digests (
+                paper_hash TEXT NOT NULL,
+                base_url TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                source_tokens INTEGER NOT NULL,
+                digest_tokens INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (paper_hash, base_url, model, prompt_version)
+            )
+            """
+        )
+        conn.commit()
+    _initialized = True
+
+
+def paper_hash(paper_text: str) -> str:
+    return hashlib.sha256(paper_text.encode("utf-8")).hexdigest()
+
+
+def get_digest(paper_hash: str, base_url: str, model: str, prompt_version: str) -> str | None:
+    """Blocking lookup; call it via ``asyncio.to_thread`` from the event loop."""
+    if not _initialized:
+        init_digests()
+    with sqlite3.connect(DB_PATH) as conn:
+        row = conn.execute(
+            """
+            SELECT digest FROM paper_digests
+            WHERE paper_hash = ? AND base_url = ? AND model = ? AND prompt_version = ?
+            """,
+            (paper_hash, base_url.rstrip("/"), model, prompt_version),
+        ).fetchone()
+    if not row:
+        _stats["misses"] += 1
+        return None
+    _stats["hits"] += 1
+    return row[0]
+
+
+def put_digest(
+    paper_hash: str,
+    base_url: str,
+    model: str,
+    prompt_version: str,
+    digest: str,
+    source_tokens: int,
+    digest_tokens: int,
+) -> None:
+    if not _initialized:
+        init_digests()
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO paper_digests(
+                paper_hash, base_url, model, prompt_version, digest, source_tokens, digest_tokens, created_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                paper_hash,
+                base_url.rstrip("/"),
+                model,
+                prompt_version,
+                digest,
+                source_tokens,
+                digest_tokens,
+                time.time(),
+            ),
+        )
+        conn.commit()
+    _stats["writes"] += 1
+
+
+def purge_digests() -> int:
+    if not _initialized:
+        init_digests()
+    with sqlite3.connect(DB_PATH) as conn:
+        removed = conn.execute("DELETE FROM paper_digests").rowcount
+        conn.commit()
+    return removed
+
+
+def digest_stats() -> dict:
+    if not _initialized:
+        init_digests()
+    with sqlite3.connect(DB_PATH) as conn:
+        entries, source, digest = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(source_tokens), 0), COALESCE(SUM(digest_tokens), 0) FROM paper_digests"
+        ).fetchone()
+    return {
+        **_stats,
+        "entries": entries,
+        "source_tokens": source,
+        "digest_tokens": digest,
+        "compression": round(digest / source, 4) if source else None,
+    }
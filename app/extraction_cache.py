@@ -0,0 +1,149 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from app.config import settings
+
+CACHE_DIR = Path("data/extraction_cache")
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+_lock = threading.Lock()
+_memory: OrderedDict[str, dict] = OrderedDict()
+_memory_bytes = 0
+_stats = {
+    "memory_hits": 0,
+    "disk_hits": 0,
+    "misses": 0,
+    "writes": 0,
+    "evictions": 0,
+}
+
+
+def pdf_sha256(source: bytes | str) -> str:
+    if isinstance(source, bytes):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    with open(source, "rb") as fh:
+        while chunk := fh.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_valid_key(key: str) -> bool:
+    return bool(_SHA256_RE.match(key))
+
+
+def _disk_path(key: str) -> Path:
+    return CACHE_DIR / key[:2] / f"{key}.json.gz"
+
+
+def _entry_size(entry: dict) -> int:
+    return len(entry.get("text", "").encode("utf-8")) + len((entry.get("title") or "").encode("utf-8"))
+
+
+def _remember(key: str, entry: dict) -> None:
+    global _memory_bytes
+    size = _entry_size(entry)
+    if size > settings.extraction_cache_memory_bytes:
+        return
+    if key in _memory:
+        _memory_bytes -= _entry_size(_memory.pop(key))
+    _memory[key] = entry
+    _memory_bytes += size
+    while _memory_bytes > settings.extraction_cache_memory_bytes and _memory:
+        _, evicted = _memory.popitem(last=False)
+        _memory_bytes -= _entry_size(evicted)
+        _stats["evictions"] += 1
+
+
+def get_cached(key: str) -> dict | None:
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            _memory.move_to_end(key)
+            _stats["memory_hits"] += 1
+            return entry
+
+    path = _disk_path(key)
+    if settings.extraction_cache_disk_enabled and path.exists():
+        try:
+            entry = json.loads(gzip.decompress(path.read_bytes()).decode("utf-8"))
+        except Exception:
+            entry = None
+        if entry is not None:
+            with _lock:
+                _remember(key, entry)
+                _stats["disk_hits"] += 1
+            return entry
+
+    with _lock:
+        _stats["misses"] += 1
+    return None
+
+
+def put_cached(key: str, entry: dict) -> None:
+    with _lock:
+        _remember(key, entry)
+        _stats["writes"] += 1
+
+    if not settings.extraction_cache_disk_enabled:
+        return
+    path = _disk_path(key)
+    payload = gzip.compress(json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+    # 先写临时文件再替换，避免并发读到半截内容。
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_bytes(payload)
+        tmp_path.replace(path)
+    except OSError:
+        # 磁盘层只是加速手段，写失败时仍保留内存层结果。
+        tmp_path.unlink(missing_ok=True)
+
+
+def purge_cache(key: str | None = None) -> int:
+    global _memory_bytes
+    removed = 0
+    with _lock:
+        if key is None:
+            removed = len(_memory)
+            _memory.clear()
+            _memory_bytes = 0
+        elif key in _memory:
+            _memory_bytes -= _entry_size(_memory.pop(key))
+            removed = 1
+
+    if not CACHE_DIR.exists():
+        return removed
+    paths = [_disk_path(key)] if key is not None else list(CACHE_DIR.glob("*/*.json.gz"))
+    disk_removed = 0
+    for path in paths:
+        if path.exists():
+            path.unlink()
+            disk_removed += 1
+    return max(removed, disk_removed)
+
+
+def cache_stats() -> dict:
+    with _lock:
+        memory_entries = len(_memory)
+        memory_bytes = _memory_bytes
+        stats = dict(_stats)
+    disk_entries = len(list(CACHE_DIR.glob("*/*.json.gz"))) if CACHE_DIR.exists() else 0
+    lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+    hits = stats["memory_hits"] + stats["disk_hits"]
+    return {
+        **stats,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        "memory_entries": memory_entries,
+        "memory_bytes": memory_bytes,
+        "memory_max_bytes": settings.extraction_cache_memory_bytes,
+        "disk_entries": disk_entries,
+        "disk_enabled": settings.extraction_cache_disk_enabled,
+    }
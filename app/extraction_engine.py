@@ -0,0 +1,202 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.config import settings
+from app.extraction_cache import get_cached, pdf_sha256, put_cached
+from app.pdf_service import (
+    PAGE_SEPARATOR,
+    PdfSource,
+    assemble_pages,
+    extract_or_probe,
+    extract_page_range,
+    split_page_ranges,
+    text_format,
+)
+
+
+class ExtractionQueueFull(RuntimeError):
+    pass
+
+
+class ExtractionTimeout(RuntimeError):
+    pass
+
+
+_executor: ProcessPoolExecutor | None = None
+_slots: asyncio.Semaphore | None = None
+_pending = 0
+# 已提交给进程池且尚未结束的任务数（含超时后仍在运行的任务）。
+_busy = 0
+
+
+def worker_count() -> int:
+    if settings.extraction_workers > 0:
+        return settings.extraction_workers
+    return os.cpu_count() or 1
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn 避免在已有事件循环/线程的进程里 fork。
+        _executor = ProcessPoolExecutor(
+            max_workers=worker_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(worker_count())
+    return _slots
+
+
+def start_engine() -> None:
+    _get_executor()
+    _get_slots()
+
+
+def shutdown_engine() -> None:
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+    _slots = None
+
+
+def engine_status() -> dict:
+    return {
+        "workers": worker_count(),
+        "queue_size": settings.extraction_queue_size,
+        "pending": _pending,
+        "busy_workers": _busy,
+        "running": _executor is not None,
+        "parallel_page_threshold": settings.extraction_parallel_page_threshold,
+        "pages_per_task": settings.extraction_pages_per_task,
+    }
+
+
+def _covers_budget(entry: dict, max_chars: int | None) -> bool:
+    if entry.get("text_format", "raw") != text_format():
+        return False
+    if not entry.get("truncated"):
+        return True
+    cached_budget = entry.get("max_chars")
+    return max_chars is not None and cached_budget is not None and cached_budget >= max_chars
+
+
+async def extract_pdf(
+    source: PdfSource,
+    max_chars: int | None = None,
+    timeout_seconds: float | None = None,
+    sha256: str | None = None,
+) -> dict:
+    """Parse a PDF in the process pool; the event loop only awaits the result.
+
+    ``source`` is raw bytes or a path to a spooled upload; with a path only the
+    path crosses the process boundary and workers memory-map the file.
+
+    Parsing stops once ``max_chars`` characters are collected. Documents above
+    ``extraction_parallel_page_threshold`` pages are split into page ranges that
+    run on several workers. Results are cached by the SHA-256 of the raw bytes,
+    so a repeat upload skips parsing unless it asks for more text than the
+    cached entry holds (``sha256`` skips re-hashing a known upload). Rejects new
+    jobs once more than workers + extraction_queue_size are pending. A timeout
+    or caller cancellation withdraws work that has not started yet.
+    """
+    global _pending
+    cache_key = None
+    if settings.extraction_cache_enabled:
+        cache_key = sha256 or await asyncio.to_thread(pdf_sha256, source)
+        cached = await asyncio.to_thread(get_cached, cache_key)
+        if cached is not None and _covers_budget(cached, max_chars):
+            if max_chars is not None and len(cached["text"]) > max_chars:
+                return {**cached, "text": cached["text"][:max_chars], "truncated": True}
+            return cached
+
+    if _pending >= worker_count() + settings.extraction_queue_size:
+        raise ExtractionQueueFull("PDF 解析队列已满，请稍后重试。")
+
+    _pending += 1
+    try:
+        result = await asyncio.wait_for(
+            _extract(source, max_chars),
+            timeout=timeout_seconds or settings.extraction_timeout_seconds,
+        )
+    except asyncio.TimeoutError as exc:
+        raise ExtractionTimeout("PDF 解析超时。") from exc
+    finally:
+        _pending -= 1
+
+    if cache_key is not None and result["text"]:
+        await asyncio.to_thread(put_cached, cache_key, result)
+    return result
+
+
+async def _extract(source: PdfSource, max_chars: int | None) -> dict:
+    # 小文档在同一次提交中直接解析完；大文档只取页数与标题，再按页段并行解析。
+    probe = await _submit(extract_or_probe, source, max_chars, settings.extraction_parallel_page_threshold)
+    if "text" in probe:
+        return probe
+
+    ranges = split_page_ranges(probe["page_count"], settings.extraction_pages_per_task)
+    # 有字符预算时按批提交，攒够预算后不再解析后续页；无预算时一次性全部提交。
+    batch_size = len(ranges) if max_chars is None else worker_count()
+    pages: list[str] = []
+    char_count = 0
+    for offset in range(0, len(ranges), batch_size):
+        if max_chars is not None and char_count >= max_chars:
+            break
+        parts = await asyncio.gather(
+            *(_submit(extract_page_range, source, start, end) for start, end in ranges[offset : offset + batch_size])
+        )
+        for part in parts:
+            pages.extend(part)
+            char_count += sum(len(page) + len(PAGE_SEPARATOR) for page in part)
+    return assemble_pages(pages, probe["title"], probe["page_count"], max_chars)
+
+
+def _release_when_done(future, slots: asyncio.Semaphore) -> None:
+    loop = asyncio.get_running_loop()
+
+    def finished() -> None:
+        global _busy
+        _busy -= 1
+        slots.release()
+
+    def release(_) -> None:
+        try:
+            loop.call_soon_threadsafe(finished)
+        except RuntimeError:
+            # 事件循环已关闭（服务退出），无需归还。
+            pass
+
+    future.add_done_callback(release)
+
+
+async def _submit(fn, *args):
+    global _busy
+    slots = _get_slots()
+    await slots.acquire()
+    try:
+        future = _get_executor().submit(fn, *args)
+    except BaseException:
+        slots.release()
+        raise
+    # 已开始的任务无法取消：超时或调用方取消后它仍占着工作进程，槽位要等任务真正结束才归还。
+    _busy += 1
+    _release_when_done(future, slots)
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BrokenProcessPool:
+        # 工作进程异常退出后进程池不可再用，下次调用时重建。
+        shutdown_engine()
+        raise
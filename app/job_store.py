@@ -0,0 +1,245 @@
+import json
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.schemas import AnalysisJobOut, AnalyzeOptions, AngleResult
+
+DB_PATH = Path("data/jobs.db")
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def init_jobs() -> None:
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS analysis_jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                paper_title TEXT,
+                options_json TEXT NOT NULL,
+                pdf_sha256 TEXT NOT NULL,
+                angles_total INTEGER NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                result_json TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_jobs_status ON analysis_jobs(status, created_at)")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_angles (
+                job_id TEXT NOT NULL,
+                angle TEXT NOT NULL,
+                result_json TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (job_id, angle)
+            )
+            """
+        )
+        conn.commit()
+
+
+def _row_to_out(conn: sqlite3.Connection, row: sqlite3.Row) -> AnalysisJobOut:
+    angles_done = conn.execute("SELECT COUNT(*) FROM job_angles WHERE job_id = ?", (row["id"],)).fetchone()[0]
+    return AnalysisJobOut(
+        job_id=row["id"],
+        status=row["status"],
+        filename=row["filename"],
+        paper_title=row["paper_title"],
+        angles_total=row["angles_total"],
+        angles_done=angles_done,
+        attempts=row["attempts"],
+        error=row["error"],
+        created_at=row["created_at"],
+        updated_at=row["updated_at"],
+    )
+
+
+def create_job(
+    job_id: str,
+    filename: str,
+    options_json: str,
+    pdf_sha256: str,
+    angles_total: int,
+) -> AnalysisJobOut:
+    init_jobs()
+    now = _now_iso()
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.row_factory = sqlite3.Row
+        conn.execute(
+            """
+            INSERT INTO analysis_jobs(
+                id, status, filename, options_json, pdf_sha256, angles_total, created_at, updated_at
+            )
+            VALUES (?, 'queued', ?, ?, ?, ?, ?, ?)
+            """,
+            (job_id, filename, options_json, pdf_sha256, angles_total, now, now),
+        )
+        conn.commit()
+        row = conn.execute("SELECT * FROM analysis_jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_out(conn, row)
+
+
+def get_job(job_id: str) -> AnalysisJobOut | None:
+    init_jobs()
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT * FROM analysis_jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_out(conn, row) if row else None
+
+
+def get_job_result(job_id: str) -> dict | None:
+    init_jobs()
+    with sqlite3.connect(DB_PATH) as conn:
+        row = conn.execute("SELECT result_json FROM analysis_jobs WHERE id = ?", (job_id,)).fetchone()
+    if not row or not row[0]:
+        return None
+    return json.loads(row[0])
+
+
+def get_job_options(job_id: str) -> AnalyzeOptions | None:
+    init_jobs()
+    with sqlite3.connect(DB_PATH) as conn:
+        row = conn.execute("SELECT options_json FROM analysis_jobs WHERE id = ?", (job_id,)).fetchone()
+    return AnalyzeOptions.model_validate_json(row[0]) if row else None
+
+
+def claim_next_job() -> dict | None:
+    """Mark the oldest queued job as running and return its row, or ``None`` if the queue is empty."""
+    init_jobs()
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.row_factory = sqlite3.Row
+        row = conn.execute(
+            "SELECT * FROM analysis_jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+        ).fetchone()
+        if not row:
+            return None
+        conn.execute(
+            "UPDATE analysis_jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+            (_now_iso(), row["id"]),
+        )
+        conn.commit()
+        return dict(row)
+
+
+def finish_job(
+    job_id: str,
+    status: str,
+    paper_title: str | None = None,
+    error: str | None = None,
+    result: dict | None = None,
+) -> bool:
+    """Move a running job to ``status``; returns False if it was cancelled meanwhile."""
+    init_jobs()
+    with sqlite3.connect(DB_PATH) as conn:
+        # 任务结束后不再需要 API Key，不在库中长期保留。
+        updated = conn.execute(
+            """
+            UPDATE analysis_jobs
+            SET status = ?, paper_title = COALESCE(?, paper_title), error = ?, result_json = ?,
+                options_json = json_remove(options_json, '$.api_key'), updated_at = ?
+            WHERE id = ? AND status = 'running'
+            """,
+            (
+                status,
+                paper_title,
+                error,
+                json.dumps(result, ensure_ascii=False) if result is not None else None,
+                _now_iso(),
+                job_id,
+            ),
+        ).rowcount
+        conn.commit()
+    return updated > 0
+
+
+def cancel_job(job_id: str) -> bool:
+    """Cancel a queued or running job; returns False if it does not exist or already ended."""
+    init_jobs()
+    with sqlite3.connect(DB_PATH) as conn:
+        updated = conn.execute(
+            """
+            UPDATE analysis_jobs
+            SET status = 'cancelled', options_json = json_remove(options_json, '$.api_key'), updated_at = ?
+            WHERE id = ? AND status IN ('queued', 'running')
+            """,
+            (_now_iso(), job_id),
+        ).rowcount
+        conn.commit()
+    return updated > 0
+
+
+def retry_job(job_id: str, api_key: str | None = None) -> bool:
+    """Queue a failed job again, optionally with a new API key; returns False if it is not failed."""
+    init_jobs()
+    with sqlite3.connect(DB_PATH) as conn:
+        updated = conn.execute(
+            """
+            UPDATE analysis_jobs
+            SET status = 'queued', error = NULL, updated_at = ?,
+                options_json = CASE WHEN ? IS NULL THEN options_json ELSE json_set(options_json, '$.api_key', ?) END
+            WHERE id = ? AND status = 'failed'
+            """,
+            (_now_iso(), api_key, api_key, job_id),
+        ).rowcount
+        conn.commit()
+    return updated > 0
+
+
+def forget_finished_api_keys() -> int:
+    """Remove API keys still stored on jobs that have already ended."""
+    init_jobs()
+    with sqlite3.connect(DB_PATH) as conn:
+        updated = conn.execute(
+            """
+            UPDATE analysis_jobs SET options_json = json_remove(options_json, '$.api_key')
+            WHERE status IN ('succeeded', 'failed', 'cancelled') AND json_extract(options_json, '$.api_key') IS NOT NULL
+            """
+        ).rowcount
+        conn.commit()
+    return updated
+
+
+def requeue_running_jobs() -> int:
+    """Put jobs left running by a previous process back in the queue."""
+    init_jobs()
+    with sqlite3.connect(DB_PATH) as conn:
+        updated = conn.execute(
+            "UPDATE analysis_jobs SET status = 'queued', updated_at = ? WHERE status = 'running'",
+            (_now_iso(),),
+        ).rowcount
+        conn.commit()
+    return updated
+
+
+def save_angle(job_id: str, result: AngleResult) -> None:
+    init_jobs()
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO job_angles(job_id, angle, result_json, created_at) VALUES (?, ?, ?, ?)",
+            (job_id, result.angle, result.model_dump_json(), _now_iso()),
+        )
+        conn.commit()
+
+
+def load_angles(job_id: str) -> dict[str, AngleResult]:
+    init_jobs()
+    with sqlite3.connect(DB_PATH) as conn:
+        rows = conn.execute("SELECT angle, result_json FROM job_angles WHERE job_id = ?", (job_id,)).fetchall()
+    return {angle: AngleResult.model_validate_json(data) for angle, data in rows}
+
+
+def job_counts() -> dict[str, int]:
+    init_jobs()
+    with sqlite3.connect(DB_PATH) as conn:
+        rows = conn.execute("SELECT status, COUNT(*) FROM analysis_jobs GROUP BY status").fetchall()
+    return dict(rows)
@@ -0,0 +1,192 @@
+import asyncio
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+from app.analyzer import analyze_paper, extraction_char_budget, pick_angle_specs
+from app.config import settings
+from app.extraction_engine import extract_pdf
+from app.job_store import (
+    cancel_job,
+    claim_next_job,
+    create_job,
+    finish_job,
+    forget_finished_api_keys,
+    job_counts,
+    load_angles,
+    requeue_running_jobs,
+    retry_job,
+    save_angle,
+)
+from app.metrics import incr
+from app.provider_store import get_provider_secret
+from app.scheduler import work_scope
+from app.schemas import AnalysisJobOut, AnalyzeOptions, AngleResult
+
+_workers: list[asyncio.Task] = []
+# 正在执行的任务：job_id -> Task，用于取消。
+_running: dict[str, asyncio.Task] = {}
+_wakeup = asyncio.Event()
+
+
+def _pdf_path(job_id: str) -> Path:
+    return Path(settings.job_dir) / f"{job_id}.pdf"
+
+
+def _remove_pdf(job_id: str) -> None:
+    try:
+        os.unlink(_pdf_path(job_id))
+    except OSError:
+        pass
+
+
+def has_job_pdf(job_id: str) -> bool:
+    return _pdf_path(job_id).exists()
+
+
+def _notify() -> None:
+    global _wakeup
+    _wakeup.set()
+    _wakeup = asyncio.Event()
+
+
+async def submit_job(options: AnalyzeOptions, filename: str, spooled: dict) -> AnalysisJobOut:
+    """Persist the spooled PDF and options and queue the analysis for the worker pool."""
+    job_id = uuid.uuid4().hex
+    path = _pdf_path(job_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # 上传的临时文件随请求结束删除，任务要保留一份重启后仍在的副本。
+    await asyncio.to_thread(shutil.copyfile, spooled["path"], path)
+    stored = options
+    if options.provider_id is not None and not options.mock_mode:
+        # 只保存 provider_id，执行时再读取 API Key。
+        stored = options.model_copy(update={"api_key": None})
+    job = create_job(
+        job_id,
+        filename=filename,
+        options_json=stored.model_dump_json(),
+        pdf_sha256=spooled["sha256"],
+        angles_total=len(pick_angle_specs(options)),
+    )
+    incr("jobs.submitted")
+    _notify()
+    return job
+
+
+def cancel_analysis_job(job_id: str) -> bool:
+    if not cancel_job(job_id):
+        return False
+    task = _running.get(job_id)
+    if task:
+        task.cancel()
+    _remove_pdf(job_id)
+    incr("jobs.cancelled")
+    return True
+
+
+def retry_analysis_job(job_id: str, api_key: str | None = None) -> bool:
+    """Queue a failed job again; angles already checkpointed are not re-run."""
+    if not retry_job(job_id, api_key):
+        return False
+    incr("jobs.retried")
+    _notify()
+    return True
+
+
+def _load_options(options_json: str) -> AnalyzeOptions:
+    options = AnalyzeOptions.model_validate_json(options_json)
+    if options.api_key:
+        return options
+    if options.mock_mode:
+        return options.model_copy(update={"api_key": "mock-api-key"})
+    secret = get_provider_secret(options.provider_id) if options.provider_id is not None else None
+    if not secret:
+        raise ValueError("任务缺少 API Key：请在重试时提供 api_key 或使用有效的 provider_id。")
+    return options.model_copy(update=secret)
+
+
+async def _run_job(job: dict) -> None:
+    job_id = job["id"]
+    try:
+        options = _load_options(job["options_json"])
+        extraction = await extract_pdf(
+            str(_pdf_path(job_id)),
+            max_chars=extraction_char_budget(options),
+            sha256=job["pdf_sha256"],
+        )
+        text = extraction["text"]
+        if not text:
+            raise ValueError("PDF 未提取到有效文本，请检查文档内容。")
+        paper_title = options.paper_title or extraction["title"] or job["filename"]
+        # 上次运行已完成的角度直接复用，只补跑缺失的角度与最终报告。
+        checkpoint = load_angles(job_id)
+        if checkpoint:
+            incr("jobs.resumed_angles", len(checkpoint))
+
+        async def on_angle_done(result: AngleResult) -> None:
+            save_angle(job_id, result)
+
+        with work_scope(job_id):
+            result = await analyze_paper(
+                options=options,
+                paper_text=text,
+                paper_title=paper_title,
+                extraction=extraction,
+                checkpoint=checkpoint,
+                on_angle_done=on_angle_done,
+            )
+    except Exception as exc:
+        # 失败任务保留 PDF，重试时从检查点继续。
+        if finish_job(job_id, "failed", error=str(exc)):
+            incr("jobs.failed")
+        return
+    if finish_job(job_id, "succeeded", paper_title=paper_title, result=result.model_dump()):
+        incr("jobs.succeeded")
+    _remove_pdf(job_id)
+
+
+async def _worker() -> None:
+    while True:
+        wakeup = _wakeup
+        job = claim_next_job()
+        if job is None:
+            await wakeup.wait()
+            continue
+        task = asyncio.create_task(_run_job(job))
+        _running[job["id"]] = task
+        try:
+            # 用户取消只结束该任务，worker 继续领取下一个。
+            await asyncio.wait({task})
+        finally:
+            _running.pop(job["id"], None)
+            if not task.done():
+                # 服务关闭：任务保持 running 状态，下次启动时重新排队并从检查点继续。
+                task.cancel()
+                await asyncio.wait({task})
+
+
+def start_jobs() -> None:
+    forget_finished_api_keys()
+    recovered = requeue_running_jobs()
+    if recovered:
+        incr("jobs.recovered", recovered)
+    for _ in range(settings.job_workers):
+        _workers.append(asyncio.create_task(_worker()))
+    _notify()
+
+
+async def shutdown_jobs() -> None:
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+async def jobs_status() -> dict:
+    # worker 与执行中任务的状态只在事件循环里读，计数查询放到线程中。
+    return {
+        "workers": len(_workers),
+        "running": sorted(_running),
+        "jobs": await asyncio.to_thread(job_counts),
+    }
@@ -1,9 +1,166 @@
+import asyncio
 import hashlib
-from collections.abc import AsyncIterator
+import random
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from email.utils import parsedate_to_datetime
 
-from openai import AsyncOpenAI
+import httpx
+from openai import APIConnectionError, APIStatusError, APITimeoutError, AsyncOpenAI, DefaultAsyncHttpxClient
 
+from app.concurrency import get_limiter
 from app.config import settings
+from app.metrics import incr
+from app.rate_limit import acquire_quota, settle_tokens
+from app.response_cache import get_response, put_response, response_key
+from app.tokenizer import count_tokens
+
+# (api_key, base_url, timeout) -> 复用的客户端，连接池与 keep-alive 跨请求共享。
+_clients: OrderedDict[tuple[str, str, float], AsyncOpenAI] = OrderedDict()
+_closing: set[asyncio.Task] = set()
+
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+EventCallback = Callable[[dict], Awaitable[None]]
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, fingerprint: str, retry_in: float):
+        super().__init__(f"服务商暂时不可用（熔断中），请 {retry_in:.0f} 秒后重试。")
+        self.fingerprint = fingerprint
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Opens after ``circuit_failure_threshold`` consecutive transient failures.
+
+    While open every call fails fast. After ``circuit_cooldown_seconds`` one probe
+    call is let through (half-open): success closes the circuit, failure reopens it.
+    A probe that ends without an outcome (cancelled or closed early) reopens it
+    for another cooldown so a later call can probe again.
+    """
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+
+    def before_call(self) -> None:
+        if self.state == "closed":
+            return
+        retry_in = self.opened_at + settings.circuit_cooldown_seconds - time.monotonic()
+        if self.state == "open" and retry_in <= 0:
+            self.state = "half_open"
+            return
+        incr("llm.circuit_rejections")
+        raise CircuitOpenError(self.fingerprint, max(retry_in, 0.0))
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self) -> bool:
+        """Returns True when this failure tripped the circuit open."""
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= settings.circuit_failure_threshold:
+            tripped = self.state != "open"
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            if tripped:
+                self.trips += 1
+                incr("llm.circuit_trips")
+            return tripped
+        return False
+
+    def release_probe(self) -> None:
+        """Called when a call exits; a half-open circuit here means its probe never recorded an outcome."""
+        if self.state == "half_open":
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures, "trips": self.trips}
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(fingerprint: str) -> CircuitBreaker:
+    breaker = _breakers.get(fingerprint)
+    if breaker is None:
+        breaker = CircuitBreaker(fingerprint)
+        _breakers[fingerprint] = breaker
+    return breaker
+
+
+def circuit_status() -> dict:
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    if isinstance(exc, (APIConnectionError, APITimeoutError, httpx.TransportError)):
+        return True
+    return isinstance(exc, APIStatusError) and exc.status_code in RETRYABLE_STATUS_CODES
+
+
+def _retry_after_seconds(exc: BaseException) -> float | None:
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    raw_ms = headers.get("retry-after-ms")
+    if raw_ms:
+        try:
+            return float(raw_ms) / 1000.0
+        except ValueError:
+            pass
+    raw = headers.get("retry-after")
+    if not raw:
+        return None
+    try:
+        return float(raw)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(raw).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_delay(exc: BaseException, attempt: int) -> float:
+    retry_after = _retry_after_seconds(exc)
+    if retry_after is not None:
+        return min(retry_after, settings.llm_retry_max_seconds)
+    # 指数退避 + 全抖动，避免多个请求同时重试。
+    ceiling = min(settings.llm_retry_max_seconds, settings.llm_retry_base_seconds * (2**attempt))
+    return random.uniform(0, ceiling)
+
+
+async def _on_failure(
+    breaker: CircuitBreaker,
+    exc: Exception,
+    attempt: int,
+    on_event: EventCallback | None,
+) -> float | None:
+    """Record a failed attempt; returns the delay before retrying, or None to give up."""
+    if not is_retryable_error(exc):
+        # 4xx 等非瞬时错误说明服务商可达，不计入熔断。
+        breaker.record_success()
+        return None
+    incr("llm.transient_errors")
+    if breaker.record_failure() and on_event:
+        await on_event({"type": "circuit_open", "cooldown_seconds": settings.circuit_cooldown_seconds})
+    if attempt >= settings.llm_max_retries or breaker.state == "open":
+        return None
+    delay = retry_delay(exc, attempt)
+    incr("llm.retries")
+    incr("llm.retry_wait_seconds", delay)
+    if on_event:
+        await on_event({"type": "retry", "attempt": attempt + 1, "delay": round(delay, 3), "error": str(exc)})
+    return delay
 
 
 def provider_fingerprint(base_url: str, model: str) -> str:
@@ -11,14 +168,138 @@ def provider_fingerprint(base_url: str, model: str) -> str:
     return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
 
 
+def client_fingerprint(client: AsyncOpenAI, model: str) -> str:
+    return provider_fingerprint(str(client.base_url).rstrip("/"), model)
+
+
+def _estimate_call_tokens(model: str, system_prompt: str, user_prompt: str, max_output_tokens: int) -> int:
+    return count_tokens(system_prompt, model) + count_tokens(user_prompt, model) + max_output_tokens
+
+
+# 需要显式 cache_control 标记才会缓存提示词前缀的模型（OpenAI/DeepSeek 等为自动前缀缓存）。
+CACHE_CONTROL_MODEL_PREFIXES = ("anthropic/", "claude", "google/gemini")
+
+
+def supports_cache_control(base_url: str, model: str) -> bool:
+    if "anthropic.com" in base_url:
+        return True
+    return "openrouter.ai" in base_url and model.lower().startswith(CACHE_CONTROL_MODEL_PREFIXES)
+
+
+def build_messages(
+    base_url: str,
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    shared_prefix: str | None = None,
+) -> list[dict]:
+    """``shared_prefix`` goes right after the system prompt so repeated calls share one cacheable prefix."""
+    if shared_prefix is None:
+        user_content: str | list[dict] = user_prompt
+    elif supports_cache_control(base_url, model):
+        user_content = [
+            {"type": "text", "text": shared_prefix, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": user_prompt},
+        ]
+    else:
+        user_content = f"{shared_prefix}\n\n{user_prompt}"
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_content},
+    ]
+
+
+def usage_event(usage) -> dict | None:
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details is not None else None
+    if cached is None:
+        # DeepSeek 使用 prompt_cache_hit_tokens 字段。
+        cached = getattr(usage, "prompt_cache_hit_tokens", None)
+    event = {
+        "type": "usage",
+        "prompt_tokens": usage.prompt_tokens or 0,
+        "completion_tokens": usage.completion_tokens or 0,
+        "cached_tokens": cached or 0,
+    }
+    incr("llm.prompt_tokens", event["prompt_tokens"])
+    incr("llm.cached_prompt_tokens", event["cached_tokens"])
+    incr("llm.completion_tokens", event["completion_tokens"])
+    return event
+
+
 def build_client(api_key: str, base_url: str, timeout_seconds: float | None = None) -> AsyncOpenAI:
+    timeout = timeout_seconds or settings.default_timeout_seconds
     return AsyncOpenAI(
         api_key=api_key,
         base_url=base_url,
-        timeout=timeout_seconds or settings.default_timeout_seconds,
+        timeout=timeout,
+        # 重试由本模块统一处理（退避、Retry-After、熔断），关闭 SDK 内置重试。
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=settings.llm_pool_max_connections,
+                max_keepalive_connections=settings.llm_pool_max_keepalive,
+                keepalive_expiry=settings.llm_pool_keepalive_seconds,
+            ),
+        ),
     )
 
 
+async def _close_later(client: AsyncOpenAI, delay: float) -> None:
+    try:
+        await asyncio.sleep(delay)
+    finally:
+        await client.close()
+
+
+def get_client(api_key: str, base_url: str, timeout_seconds: float | None = None) -> AsyncOpenAI:
+    """Return the shared client for (api_key, base_url, timeout), creating it on demand.
+
+    Least recently used clients beyond ``llm_client_cache_size`` are evicted and
+    closed after ``llm_client_close_grace_seconds`` so in-flight calls can finish.
+    """
+    key = (api_key, base_url, timeout_seconds or settings.default_timeout_seconds)
+    client = _clients.get(key)
+    if client is not None and not client.is_closed():
+        _clients.move_to_end(key)
+        return client
+
+    client = build_client(api_key, base_url, timeout_seconds)
+    _clients[key] = client
+    while len(_clients) > settings.llm_client_cache_size:
+        _, evicted = _clients.popitem(last=False)
+        task = asyncio.get_running_loop().create_task(
+            _close_later(evicted, settings.llm_client_close_grace_seconds)
+        )
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+    return client
+
+
+async def close_all_clients() -> None:
+    for task in list(_closing):
+        # 取消等待，_close_later 的 finally 会立即关闭客户端。
+        task.cancel()
+    await asyncio.gather(*_closing, return_exceptions=True)
+    clients = list(_clients.values())
+    _clients.clear()
+    await asyncio.gather(*(client.close() for client in clients), return_exceptions=True)
+
+
+def client_pool_status() -> dict:
+    return {
+        "clients": len(_clients),
+        "max_clients": settings.llm_client_cache_size,
+        "closing": len(_closing),
+        "max_connections": settings.llm_pool_max_connections,
+        "max_keepalive_connections": settings.llm_pool_max_keepalive,
+        "keepalive_expiry_seconds": settings.llm_pool_keepalive_seconds,
+    }
+
+
 async def chat_once(
     client: AsyncOpenAI,
     model: str,
@@ -27,20 +308,63 @@ async def chat_once(
     temperature: float,
     max_output_tokens: int,
     reasoning: dict | None = None,
+    use_cache: bool = False,
+    on_event: EventCallback | None = None,
+    shared_prefix: str | None = None,
 ) -> str:
+    full_prompt = user_prompt if shared_prefix is None else f"{shared_prefix}\n\n{user_prompt}"
+    cache_key = None
+    if use_cache and settings.llm_cache_enabled:
+        cache_key = response_key(
+            str(client.base_url), model, system_prompt, full_prompt, temperature, max_output_tokens, reasoning
+        )
+        cached = await asyncio.to_thread(get_response, cache_key)
+        if cached is not None:
+            return cached
+
+    base_url = str(client.base_url)
     kwargs = {
         "model": model,
         "temperature": temperature,
         "max_tokens": max_output_tokens,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
+        "messages": build_messages(base_url, model, system_prompt, user_prompt, shared_prefix),
     }
     if reasoning:
         kwargs["extra_body"] = {"reasoning": reasoning}
-    resp = await client.chat.completions.create(**kwargs)
-    return resp.choices[0].message.content or ""
+    fingerprint = client_fingerprint(client, model)
+    breaker = get_breaker(fingerprint)
+    estimated_tokens = _estimate_call_tokens(model, system_prompt, full_prompt, max_output_tokens)
+    attempt = 0
+    try:
+        while True:
+            breaker.before_call()
+            try:
+                await acquire_quota(base_url, estimated_tokens)
+                async with get_limiter(fingerprint).slot():
+                    resp = await client.chat.completions.create(**kwargs)
+            except Exception as exc:
+                delay = await _on_failure(breaker, exc, attempt, on_event)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            breaker.record_success()
+            break
+    except asyncio.CancelledError:
+        # 调用方取消（如客户端断开）：排队、请求中或退避等待中的调用一并放弃。
+        incr("llm.cancelled_calls")
+        raise
+    finally:
+        breaker.release_probe()
+    settle_tokens(base_url, estimated_tokens, resp.usage.total_tokens if resp.usage else None)
+    usage = usage_event(resp.usage)
+    if usage and on_event:
+        await on_event(usage)
+    content = resp.choices[0].message.content or ""
+    if cache_key is not None and content:
+        await asyncio.to_thread(put_response, cache_key, model, content)
+    return content
 
 
 async def chat_stream(
@@ -79,25 +403,117 @@ async def chat_stream_events(
     temperature: float,
     max_output_tokens: int,
     reasoning: dict | None = None,
+    use_cache: bool = False,
+    shared_prefix: str | None = None,
+    include_usage: bool = False,
 ) -> AsyncIterator[dict]:
+    """Yield ``content``/``reasoning`` deltas.
+
+    Transient failures before the first delta are retried with backoff and
+    reported as ``retry`` events; a failure after output has started is raised
+    to the caller. ``circuit_open`` is yielded when a failure trips the breaker.
+    With ``shared_prefix`` or ``include_usage`` the provider is asked for usage
+    and a ``usage`` event (including cached prompt tokens) is yielded at the end.
+    """
+    full_prompt = user_prompt if shared_prefix is None else f"{shared_prefix}\n\n{user_prompt}"
+    cache_key = None
+    if use_cache and settings.llm_cache_enabled:
+        cache_key = response_key(
+            str(client.base_url), model, system_prompt, full_prompt, temperature, max_output_tokens, reasoning
+        )
+        cached = await asyncio.to_thread(get_response, cache_key)
+        if cached is not None:
+            # 命中缓存时按小块回放，前端看到的仍是逐段增量。
+            step = max(1, settings.llm_cache_replay_chunk_chars)
+            for start in range(0, len(cached), step):
+                yield {"type": "content", "text": cached[start : start + step], "cached": True}
+            return
+
+    base_url = str(client.base_url)
     kwargs = {
         "model": model,
         "temperature": temperature,
         "max_tokens": max_output_tokens,
         "stream": True,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
+        "messages": build_messages(base_url, model, system_prompt, user_prompt, shared_prefix),
     }
+    if shared_prefix is not None or include_usage:
+        kwargs["stream_options"] = {"include_usage": True}
     if reasoning is not None:
         kwargs["extra_body"] = {"reasoning": reasoning}
-    stream = await client.chat.completions.create(**kwargs)
-    async for chunk in stream:
-        delta_obj = chunk.choices[0].delta
-        content = getattr(delta_obj, "content", None) or ""
-        if content:
-            yield {"type": "content", "text": content}
-        reasoning_text = getattr(delta_obj, "reasoning", None) or getattr(delta_obj, "reasoning_content", None) or ""
-        if reasoning_text:
-            yield {"type": "reasoning", "text": reasoning_text}
+    fingerprint = client_fingerprint(client, model)
+    breaker = get_breaker(fingerprint)
+    estimated_tokens = _estimate_call_tokens(model, system_prompt, full_prompt, max_output_tokens)
+    content_parts: list[str] = []
+    attempt = 0
+    try:
+        while True:
+            breaker.before_call()
+            started_output = False
+            events: list[dict] = []
+            try:
+                await acquire_quota(base_url, estimated_tokens)
+                async with get_limiter(fingerprint).slot() as slot:
+                    started = time.monotonic()
+                    stream = await client.chat.completions.create(**kwargs)
+                    try:
+                        async for chunk in stream:
+                            if slot["latency"] is None:
+                                # 首包延迟作为限流器的拥塞信号。
+                                slot["latency"] = time.monotonic() - started
+                            usage = usage_event(getattr(chunk, "usage", None))
+                            if usage:
+                                actual = usage["prompt_tokens"] + usage["completion_tokens"]
+                                settle_tokens(base_url, estimated_tokens, actual)
+                                yield usage
+                            if not chunk.choices:
+                                continue
+                            delta_obj = chunk.choices[0].delta
+                            content = getattr(delta_obj, "content", None) or ""
+                            if content:
+                                started_output = True
+                                content_parts.append(content)
+                                yield {"type": "content", "text": content}
+                            reasoning_text = (
+                                getattr(delta_obj, "reasoning", None)
+                                or getattr(delta_obj, "reasoning_content", None)
+                                or ""
+                            )
+                            if reasoning_text:
+                                started_output = True
+                                yield {"type": "reasoning", "text": reasoning_text}
+                    finally:
+                        # 提前结束（取消或调用方关闭）时主动关闭上游连接，服务端随之停止生成。
+                        await stream.close()
+            except Exception as exc:
+                if started_output:
+                    # 已输出部分内容，无法透明重试，交给调用方处理。
+                    if is_retryable_error(exc):
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                    raise
+                delay = await _on_failure(breaker, exc, attempt, _collect(events))
+                for event in events:
+                    yield event
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            breaker.record_success()
+            break
+    except (asyncio.CancelledError, GeneratorExit):
+        incr("llm.cancelled_calls")
+        raise
+    finally:
+        breaker.release_probe()
+    if cache_key is not None and content_parts:
+        await asyncio.to_thread(put_response, cache_key, model, "".join(content_parts))
+
+
+def _collect(events: list[dict]) -> EventCallback:
+    async def append(event: dict) -> None:
+        events.append(event)
+
+    return append
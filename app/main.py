@@ -2,20 +2,51 @@ import json
 import platform
 import re
 import subprocess
+from contextlib import AsyncExitStack, aclosing
 from datetime import datetime
 from pathlib import Path
 import asyncio
 
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 
-from app.analyzer import analyze_paper, analyze_paper_stream
+from app.analyzer import analyze_paper, analyze_paper_stream, extraction_char_budget
+from app.batch_stream import stream_batch
 from app.catalog_sync import periodic_sync_loop, sync_catalog_once
+from app.concurrency import limiter_status
 from app.config import settings
-from app.llm_client import build_client, chat_once, provider_fingerprint
-from app.pdf_service import extract_text_from_pdf_bytes
+from app.deadline import Deadline, start_deadline
+from app.digest_store import digest_stats, init_digests, purge_digests
+from app.extraction_cache import cache_stats, is_valid_key, purge_cache
+from app.extraction_engine import (
+    ExtractionQueueFull,
+    ExtractionTimeout,
+    engine_status,
+    extract_pdf,
+    shutdown_engine,
+    start_engine,
+)
+from app.job_store import get_job, get_job_options, get_job_result
+from app.jobs import (
+    cancel_analysis_job,
+    has_job_pdf,
+    jobs_status,
+    retry_analysis_job,
+    shutdown_jobs,
+    start_jobs,
+    submit_job,
+)
+from app.llm_client import (
+    chat_once,
+    circuit_status,
+    client_pool_status,
+    close_all_clients,
+    get_client,
+    provider_fingerprint,
+)
+from app.metrics import metrics_snapshot
 from app.prompts import SYSTEM_PROMPT
 from app.provider_catalog import get_catalog_sync_status, get_provider_catalog
 from app.provider_store import (
@@ -26,12 +57,17 @@ from app.provider_store import (
     list_providers,
     update_provider,
 )
+from app.rate_limit import rate_limit_status
+from app.response_cache import init_cache, purge_responses, response_cache_stats
+from app.scheduler import new_request_id, work_scope
 from app.schemas import (
+    AnalysisJobOut,
     AnalyzeOptions,
     AngleExport,
     BatchExportDocxRequest,
     ExportDocxRequest,
     ExportDocxResponse,
+    JobRetryRequest,
     ModelConnectionRequest,
     ModelConnectionResponse,
     PaperExport,
@@ -39,6 +75,9 @@ from app.schemas import (
     ProviderConfigOut,
     ProviderConfigUpdate,
 )
+from app.singleflight import flight_key, inflight_status, join_stream, run_shared
+from app.sse import EventStreamResponse, relay_until_disconnect
+from app.upload_spool import spooled_upload
 
 app = FastAPI(title=settings.app_name, version="0.1.0")
 app.add_middleware(
@@ -78,10 +117,28 @@ def _resolve_options(raw: AnalyzeOptions) -> AnalyzeOptions:
     return AnalyzeOptions.model_validate(data)
 
 
+async def _extract_or_raise(spooled: dict, max_chars: int | None, deadline: Deadline | None = None) -> dict:
+    try:
+        return await extract_pdf(
+            spooled["path"],
+            max_chars=max_chars,
+            sha256=spooled["sha256"],
+            timeout_seconds=deadline.extraction_timeout() if deadline else None,
+        )
+    except ExtractionQueueFull as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    except ExtractionTimeout as exc:
+        raise HTTPException(status_code=504, detail=str(exc)) from exc
+
+
 @app.on_event("startup")
 async def _startup():
     global sync_stop_event, sync_task
     init_store()
+    init_cache()
+    init_digests()
+    start_engine()
+    start_jobs()
     if settings.catalog_sync_enabled:
         sync_stop_event = asyncio.Event()
         sync_task = asyncio.create_task(periodic_sync_loop(sync_stop_event))
@@ -97,6 +154,9 @@ async def _shutdown():
             await sync_task
         except Exception:
             pass
+    await shutdown_jobs()
+    shutdown_engine()
+    await close_all_clients()
 
 
 @app.get("/")
@@ -122,6 +182,83 @@ async def health():
     return {"ok": True, "service": settings.app_name}
 
 
+@app.get("/v1/extraction/status")
+async def extraction_status():
+    return engine_status()
+
+
+@app.get("/v1/admin/llm-clients")
+async def llm_client_status():
+    return client_pool_status()
+
+
+@app.get("/v1/admin/metrics")
+async def admin_metrics():
+    return {"counters": metrics_snapshot(), "circuit_breakers": circuit_status()}
+
+
+@app.get("/v1/admin/concurrency")
+async def concurrency_status():
+    return limiter_status()
+
+
+@app.get("/v1/admin/inflight")
+async def inflight_analyses():
+    return inflight_status()
+
+
+@app.get("/v1/admin/jobs")
+async def analysis_jobs_status():
+    return await jobs_status()
+
+
+@app.get("/v1/admin/rate-limits")
+async def rate_limits_status():
+    return rate_limit_status()
+
+
+@app.get("/v1/admin/llm-cache")
+async def llm_cache_status():
+    return await asyncio.to_thread(response_cache_stats)
+
+
+@app.delete("/v1/admin/llm-cache")
+async def purge_llm_cache():
+    return {"ok": True, "removed": await asyncio.to_thread(purge_responses)}
+
+
+@app.get("/v1/admin/paper-digests")
+async def paper_digest_status():
+    return await asyncio.to_thread(digest_stats)
+
+
+@app.delete("/v1/admin/paper-digests")
+async def purge_paper_digest_cache():
+    return {"ok": True, "removed": await asyncio.to_thread(purge_digests)}
+
+
+@app.get("/v1/admin/extraction-cache")
+async def extraction_cache_status():
+    return await asyncio.to_thread(cache_stats)
+
+
+@app.delete("/v1/admin/extraction-cache")
+async def purge_extraction_cache():
+    removed = await asyncio.to_thread(purge_cache)
+    return {"ok": True, "removed": removed}
+
+
+@app.delete("/v1/admin/extraction-cache/{sha256}")
+async def purge_extraction_cache_entry(sha256: str):
+    key = sha256.lower()
+    if not is_valid_key(key):
+        raise HTTPException(status_code=400, detail="无效的 SHA-256")
+    removed = await asyncio.to_thread(purge_cache, key)
+    if not removed:
+        raise HTTPException(status_code=404, detail="缓存条目不存在")
+    return {"ok": True, "removed": removed}
+
+
 @app.get("/v1/catalog/providers")
 async def provider_catalog():
     return {"providers": get_provider_catalog()}
@@ -142,7 +279,7 @@ async def catalog_sync_trigger():
 @app.post("/v1/models/validate", response_model=ModelConnectionResponse)
 async def validate_model_connection(req: ModelConnectionRequest):
     try:
-        client = build_client(
+        client = get_client(
             api_key=req.api_key,
             base_url=str(req.base_url),
             timeout_seconds=req.timeout_seconds,
@@ -219,18 +356,33 @@ async def analyze_paper_endpoint(
     except Exception as exc:
         raise HTTPException(status_code=400, detail=f"options_json 解析失败: {exc}") from exc
 
-    raw = await file.read()
-    text, meta_title = extract_text_from_pdf_bytes(raw)
+    deadline = start_deadline(options.deadline_seconds)
+    async with spooled_upload(file) as spooled:
+        extraction = await _extract_or_raise(spooled, extraction_char_budget(options), deadline)
+        pdf_sha256 = spooled["sha256"]
+    text = extraction["text"]
     if not text:
         raise HTTPException(status_code=400, detail="PDF 未提取到有效文本，请检查文档内容。")
 
-    paper_title = options.paper_title or meta_title or file.filename
-    result = await analyze_paper(options=options, paper_text=text, paper_title=paper_title)
+    paper_title = options.paper_title or extraction["title"] or file.filename
+    # 同一论文、同一配置的分析正在进行时直接等待其结果，不重复调用模型。
+    with work_scope(new_request_id()):
+        result = await run_shared(
+            flight_key("analyze", pdf_sha256, paper_title, options),
+            lambda: analyze_paper(
+                options=options,
+                paper_text=text,
+                paper_title=paper_title,
+                extraction=extraction,
+                deadline=deadline,
+            ),
+        )
     return JSONResponse(content=result.model_dump())
 
 
 @app.post("/v1/papers/analyze/stream")
 async def analyze_paper_stream_endpoint(
+    request: Request,
     options_json: str = Form(..., description="AnalyzeOptions 的 JSON 字符串"),
     file: UploadFile = File(..., description="论文 PDF 文件"),
 ):
@@ -242,26 +394,34 @@ async def analyze_paper_stream_endpoint(
     except Exception as exc:
         raise HTTPException(status_code=400, detail=f"options_json 解析失败: {exc}") from exc
 
-    raw = await file.read()
-    text, meta_title = extract_text_from_pdf_bytes(raw)
+    deadline = start_deadline(options.deadline_seconds, options.enable_final_report)
+    async with spooled_upload(file) as spooled:
+        extraction = await _extract_or_raise(spooled, extraction_char_budget(options), deadline)
+        pdf_sha256 = spooled["sha256"]
+    text = extraction["text"]
     if not text:
         raise HTTPException(status_code=400, detail="PDF 未提取到有效文本，请检查文档内容。")
-    paper_title = options.paper_title or meta_title or file.filename
+    paper_title = options.paper_title or extraction["title"] or file.filename
 
     async def event_stream():
-        async for item in analyze_paper_stream(options=options, paper_text=text, paper_title=paper_title):
-            payload = json.dumps(item, ensure_ascii=False)
-            yield f"data: {payload}\n\n"
-
-    return StreamingResponse(
-        event_stream(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        },
-    )
+        # 同一论文、同一配置的流式分析正在进行时挂到已有分析上：先回放已产生的事件，再跟随后续输出。
+        with work_scope(new_request_id()):
+            events = join_stream(
+                flight_key("stream", pdf_sha256, paper_title, options),
+                lambda: analyze_paper_stream(
+                    options=options,
+                    paper_text=text,
+                    paper_title=paper_title,
+                    extraction=extraction,
+                    deadline=deadline,
+                ),
+            )
+        async with aclosing(events):
+            async for item in events:
+                payload = json.dumps(item, ensure_ascii=False)
+                yield f"data: {payload}\n\n"
+
+    return EventStreamResponse(relay_until_disconnect(request, event_stream()))
 
 
 @app.post("/v1/papers/analyze/batch")
@@ -277,7 +437,10 @@ async def analyze_paper_batch_endpoint(
     except Exception as exc:
         raise HTTPException(status_code=400, detail=f"options_json 解析失败: {exc}") from exc
 
-    semaphore = asyncio.Semaphore(options.parallel_limit)
+    # 限制同时落盘/解析的文件数，批量再大峰值内存也保持平稳。
+    resident = asyncio.Semaphore(settings.batch_resident_files)
+    # 整个批次是一个请求，其中每篇论文各占一个调度单元。
+    request_id = new_request_id()
 
     async def analyze_single(upload: UploadFile) -> dict:
         filename = upload.filename or "unknown.pdf"
@@ -288,17 +451,36 @@ async def analyze_paper_batch_endpoint(
                 "error": "仅支持 PDF 文件。",
             }
         try:
-            raw = await upload.read()
-            text, meta_title = extract_text_from_pdf_bytes(raw)
+            async with resident, spooled_upload(upload) as spooled:
+                # 每篇论文的时限从开始处理时计算，不含排队等待落盘的时间。
+                deadline = start_deadline(options.deadline_seconds)
+                extraction = await extract_pdf(
+                    spooled["path"],
+                    max_chars=extraction_char_budget(options),
+                    sha256=spooled["sha256"],
+                    timeout_seconds=deadline.extraction_timeout() if deadline else None,
+                )
+                pdf_sha256 = spooled["sha256"]
+            text = extraction["text"]
             if not text:
                 return {
                     "filename": filename,
                     "ok": False,
                     "error": "PDF 未提取到有效文本，请检查文档内容。",
                 }
-            paper_title = meta_title or filename
-            async with semaphore:
-                result = await analyze_paper(options=options, paper_text=text, paper_title=paper_title)
+            paper_title = extraction["title"] or filename
+            # 模型调用并发由按服务商自适应的限流器统一调度；重复的论文共享同一次分析。
+            with work_scope(request_id):
+                result = await run_shared(
+                    flight_key("analyze", pdf_sha256, paper_title, options),
+                    lambda: analyze_paper(
+                        options=options,
+                        paper_text=text,
+                        paper_title=paper_title,
+                        extraction=extraction,
+                        deadline=deadline,
+                    ),
+                )
             return {
                 "filename": filename,
                 "ok": True,
@@ -323,6 +505,108 @@ async def analyze_paper_batch_endpoint(
     )
 
 
+@app.post("/v1/papers/analyze/batch/stream")
+async def analyze_paper_batch_stream_endpoint(
+    request: Request,
+    options_json: str = Form(..., description="AnalyzeOptions 的 JSON 字符串"),
+    files: list[UploadFile] = File(..., description="论文 PDF 文件（可多选）"),
+):
+    if not files:
+        raise HTTPException(status_code=400, detail="至少上传一个 PDF 文件。")
+
+    try:
+        options = _resolve_options(AnalyzeOptions.model_validate(json.loads(options_json)))
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"options_json 解析失败: {exc}") from exc
+
+    # 端点返回后 FastAPI 会关闭上传文件，因此先全部落盘，临时文件随事件流结束一并删除。
+    spools = AsyncExitStack()
+    uploads: list[tuple[str, dict | None]] = []
+    try:
+        for upload in files:
+            filename = upload.filename or "unknown.pdf"
+            if filename.lower().endswith(".pdf"):
+                uploads.append((filename, await spools.enter_async_context(spooled_upload(upload))))
+            else:
+                uploads.append((filename, None))
+    except BaseException:
+        await spools.aclose()
+        raise
+
+    async def event_stream():
+        async with spools:
+            events = stream_batch(options, uploads, new_request_id())
+            async with aclosing(events):
+                async for item in events:
+                    payload = json.dumps(item, ensure_ascii=False)
+                    yield f"data: {payload}\n\n"
+
+    return EventStreamResponse(relay_until_disconnect(request, event_stream()))
+
+
+@app.post("/v1/jobs", response_model=AnalysisJobOut)
+async def submit_analysis_job(
+    options_json: str = Form(..., description="AnalyzeOptions 的 JSON 字符串"),
+    file: UploadFile = File(..., description="论文 PDF 文件"),
+):
+    if not file.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="仅支持 PDF 文件。")
+
+    try:
+        options = _resolve_options(AnalyzeOptions.model_validate(json.loads(options_json)))
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"options_json 解析失败: {exc}") from exc
+
+    async with spooled_upload(file) as spooled:
+        return await submit_job(options, file.filename, spooled)
+
+
+@app.get("/v1/jobs/{job_id}", response_model=AnalysisJobOut)
+async def analysis_job_status(job_id: str):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
+
+
+@app.get("/v1/jobs/{job_id}/result")
+async def analysis_job_result(job_id: str):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"任务尚未完成（{job.status}）")
+    return JSONResponse(content=get_job_result(job_id))
+
+
+@app.post("/v1/jobs/{job_id}/cancel", response_model=AnalysisJobOut)
+async def cancel_analysis_job_endpoint(job_id: str):
+    if not cancel_analysis_job(job_id):
+        if not get_job(job_id):
+            raise HTTPException(status_code=404, detail="任务不存在")
+        raise HTTPException(status_code=409, detail="任务已结束，无法取消")
+    return get_job(job_id)
+
+
+@app.post("/v1/jobs/{job_id}/retry", response_model=AnalysisJobOut)
+async def retry_analysis_job_endpoint(job_id: str, payload: JobRetryRequest | None = None):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if job.status != "failed":
+        raise HTTPException(status_code=409, detail=f"只有失败的任务可以重试（当前 {job.status}）")
+    if not has_job_pdf(job_id):
+        raise HTTPException(status_code=409, detail="任务 PDF 已删除，请重新提交任务")
+    api_key = payload.api_key if payload else None
+    options = get_job_options(job_id)
+    # 任务结束时已清除 API Key，未使用 provider_id 的任务需重新提供。
+    if not api_key and options.provider_id is None and not options.mock_mode:
+        raise HTTPException(status_code=400, detail="该任务未使用 provider_id，重试时请提供 api_key")
+    if not retry_analysis_job(job_id, api_key):
+        raise HTTPException(status_code=409, detail="任务状态已变化，无法重试")
+    return get_job(job_id)
+
+
 EXPORTS_DIR = Path("exports")
 
 
@@ -0,0 +1,12 @@
+from collections import defaultdict
+
+# 进程内计数器，供 /v1/admin/metrics 查看；进程重启后清零。
+_counters: defaultdict[str, float] = defaultdict(float)
+
+
+def incr(name: str, value: float = 1.0) -> None:
+    _counters[name] += value
+
+
+def metrics_snapshot() -> dict[str, float]:
+    return {name: round(value, 3) for name, value in sorted(_counters.items())}
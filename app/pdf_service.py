@@ -1,16 +1,123 @@
+import mmap
+from collections.abc import Iterator
+from contextlib import contextmanager
 from io import BytesIO
 
 from pypdf import PdfReader
 
+from app.config import settings
+from app.text_normalizer import normalize_pages
 
-def extract_text_from_pdf_bytes(raw: bytes) -> tuple[str, str | None]:
-    reader = PdfReader(BytesIO(raw))
-    title = None
+PAGE_SEPARATOR = "\n\n"
+
+# 原始字节或磁盘上的 PDF 路径；传路径时工作进程自行内存映射文件，避免跨进程复制整份 PDF。
+PdfSource = bytes | str
+
+
+@contextmanager
+def open_pdf(source: PdfSource) -> Iterator[PdfReader]:
+    if isinstance(source, bytes):
+        yield PdfReader(BytesIO(source))
+        return
+    with open(source, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield PdfReader(mapped)
+
+
+def _metadata_title(reader: PdfReader) -> str | None:
     if reader.metadata:
-        title = reader.metadata.title
+        return reader.metadata.title
+    return None
+
+
+def probe_pdf(source: PdfSource) -> dict:
+    with open_pdf(source) as reader:
+        return {"page_count": len(reader.pages), "title": _metadata_title(reader)}
+
+
+def split_page_ranges(page_count: int, pages_per_range: int) -> list[tuple[int, int]]:
+    step = max(1, pages_per_range)
+    return [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+
+
+def extract_page_range(source: PdfSource, start: int, end: int) -> list[str]:
+    with open_pdf(source) as reader:
+        return [reader.pages[i].extract_text() or "" for i in range(start, min(end, len(reader.pages)))]
+
 
+def text_format() -> str:
+    """Identifies how page text is post-processed; cached extractions in another format are stale."""
+    if not settings.text_normalization_enabled:
+        return "raw"
+    return "normalized-v2" + ("-norefs" if settings.strip_references else "")
+
+
+def assemble_pages(
+    pages: list[str],
+    title: str | None,
+    page_count: int,
+    max_chars: int | None = None,
+) -> dict:
+    sections: list[dict] = []
+    normalization = None
+    if settings.text_normalization_enabled:
+        normalized = normalize_pages(pages, strip_references=settings.strip_references)
+        text, sections, normalization = normalized["text"], normalized["sections"], normalized["stats"]
+    else:
+        text = PAGE_SEPARATOR.join(pages).strip()
+    truncated = len(pages) < page_count
+    if max_chars is not None and len(text) > max_chars:
+        text = text[:max_chars]
+        truncated = True
+        sections = [{**section, "end": min(section["end"], max_chars)} for section in sections if section["start"] < max_chars]
+    return {
+        "text": text,
+        "title": title,
+        "page_count": page_count,
+        "pages_parsed": len(pages),
+        "truncated": truncated,
+        "max_chars": max_chars,
+        "sections": sections,
+        "normalization": normalization,
+        "text_format": text_format(),
+    }
+
+
+def extract_pdf_bytes(source: PdfSource, max_chars: int | None = None) -> dict:
+    """Extract page text in order, stopping once ``max_chars`` is reached.
+
+    ``source`` is the raw PDF bytes or a path to a PDF on disk. Returns the text
+    plus ``page_count`` (pages in the document), ``pages_parsed`` and
+    ``truncated`` (True when pages were skipped or the text was cut).
+    """
+    with open_pdf(source) as reader:
+        return _extract_reader(reader, max_chars)
+
+
+def _extract_reader(reader: PdfReader, max_chars: int | None) -> dict:
     pages = []
+    char_count = 0
     for page in reader.pages:
-        pages.append(page.extract_text() or "")
+        if max_chars is not None and char_count >= max_chars:
+            break
+        page_text = page.extract_text() or ""
+        pages.append(page_text)
+        char_count += len(page_text) + len(PAGE_SEPARATOR)
+    return assemble_pages(pages, _metadata_title(reader), len(reader.pages), max_chars)
+
+
+def extract_or_probe(source: PdfSource, max_chars: int | None, page_threshold: int) -> dict:
+    """Extract documents below ``page_threshold`` pages; for larger ones only probe them.
+
+    Runs in the pool so even the page-tree parse of the probe stays off the
+    server process. A probe result has ``page_count`` and ``title`` but no ``text``.
+    """
+    with open_pdf(source) as reader:
+        if len(reader.pages) >= page_threshold:
+            return {"page_count": len(reader.pages), "title": _metadata_title(reader)}
+        return _extract_reader(reader, max_chars)
+
+
+def extract_text_from_pdf_bytes(raw: bytes) -> tuple[str, str | None]:
+    result = extract_pdf_bytes(raw)
+    return result["text"], result["title"]
 
-    return "\n\n".join(pages).strip(), title
@@ -33,6 +33,16 @@ DEFAULT_ANGLE_SPECS = [
     },
 ]
 
+# 检索模式下附加到默认角度查询中的英文关键词（多数论文正文为英文）。
+ANGLE_QUERY_HINTS = {
+    "主题与研究问题": "abstract introduction motivation problem challenge goal contribution research question",
+    "方法论与实验设计": "method approach framework architecture model dataset baseline setup experiment training evaluation",
+    "核心创新点": "novel contribution propose first unlike prior work related work improvement key idea",
+    "结果与证据强度": "results table accuracy performance outperforms improvement ablation significance error analysis",
+    "局限性与潜在风险": "limitation failure bias risk future work ethical assumption generalization",
+    "可复现性与工程实现建议": "implementation details hyperparameters code appendix compute gpu training time reproducibility",
+}
+
 SYSTEM_PROMPT = dedent("""
     # 角色
     你是一名严谨的学术论文分析助手。
@@ -70,6 +80,110 @@ def build_angle_prompt(
 """).strip()
 
 
+def build_paper_context(paper_title: str, paper_text: str) -> str:
+    """Per-paper prefix shared by every angle call in the ``prefix_cache`` layout."""
+    return dedent(f"""
+# 论文信息
+论文标题：{paper_title}
+
+# 论文正文（节选）：
+{paper_text}
+""").strip()
+
+
+def build_angle_task(angle_title: str, angle_instruction: str, user_prompt: str | None) -> str:
+    return dedent(f"""
+# 分析任务
+分析角度标题：{angle_title}
+角度分析要求：{angle_instruction}
+
+# 要求
+{user_prompt or "无"}
+
+现在，请直接输出论文的分析：
+""").strip()
+
+
+ANGLE_MARKER = "<<<ANGLE {index}>>>"
+END_MARKER = "<<<END>>>"
+
+
+def build_multi_angle_prompt(
+    angle_specs: list[tuple[str, str]],
+    paper_title: str,
+    paper_text: str,
+    user_prompt: str | None,
+) -> str:
+    """One prompt asking for every angle, each section opened by ``<<<ANGLE n>>>``."""
+    angles = "\n".join(
+        f"{ANGLE_MARKER.format(index=i)} {title}：{instruction}"
+        for i, (title, instruction) in enumerate(angle_specs, start=1)
+    )
+    return dedent(f"""
+# 论文信息
+论文标题：{paper_title}
+
+# 分析角度
+{angles}
+
+# 要求
+{user_prompt or "无"}
+
+# 输出格式
+按上述顺序逐个角度输出分析。每个角度单独一行以该角度的标记开头（如 {ANGLE_MARKER.format(index=1)}），标记行后紧接该角度的分析正文；
+不要重复角度标题，不要在正文中出现 <<< 或 >>>。全部角度输出完毕后单独一行输出 {END_MARKER}。
+
+# 论文正文（节选）：
+{paper_text}
+
+现在，请直接按格式输出论文的分析：
+""").strip()
+
+
+def build_chunk_notes_prompt(
+    angle_titles: list[str],
+    paper_title: str,
+    chunk_index: int,
+    chunk_count: int,
+    chunk_text: str,
+) -> str:
+    angles = "\n".join(f"- {title}" for title in angle_titles)
+    return dedent(f"""
+# 任务
+下面是论文《{paper_title}》正文的第 {chunk_index}/{chunk_count} 个片段。请摘录该片段中与下列分析角度相关的关键信息，供后续汇总分析使用。
+
+# 分析角度
+{angles}
+
+# 要求
+1) 只摘录片段中明确出现的事实：问题与动机、方法细节、实验设置、数据与数值结果、结论、局限、实现细节等。
+2) 按角度分组输出要点，保留关键数字、数据集与模型名称；片段与某角度无关时该角度不输出。
+3) 不做评价和推断，不要输出与论文无关的内容；片段整体无有效信息时只输出“无”。
+
+# 论文片段：
+{chunk_text}
+""").strip()
+
+
+# 摘要提示词变更时递增，旧版本缓存的摘要自动失效。
+DIGEST_PROMPT_VERSION = "v1"
+
+
+def build_digest_prompt(paper_title: str, paper_text: str) -> str:
+    return dedent(f"""
+# 任务
+将论文《{paper_title}》浓缩为一份信息密集的结构化摘要。该摘要将替代原文，供后续从多个角度（研究问题、方法与实验设计、创新点、结果与证据、局限与风险、可复现性）分析使用。
+
+# 要求
+1) 按以下小节输出：研究问题与动机、方法与关键设计、实验设置（数据集/基线/指标/超参数）、主要结果（保留关键数值与对比）、消融与误差分析、作者声明的局限、实现与复现细节、其他重要信息。
+2) 尽量保留原文中的具体数字、数据集与模型名称、公式要点和实验结论，不要泛泛概括。
+3) 只陈述论文内容，不做评价和推断；原文未涉及的小节写“未提及”。
+
+# 论文正文（节选）：
+{paper_text}
+""").strip()
+
+
 def build_final_summary_prompt(angle_results: dict[str, str]) -> str:
     sections = []
     for angle, result in angle_results.items():
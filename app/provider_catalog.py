@@ -1,5 +1,6 @@
 import json
 from pathlib import Path
+from urllib.parse import urlparse
 
 
 CACHE_PATH = Path("data/provider_catalog_cache.json")
@@ -145,3 +146,34 @@ def get_provider_catalog() -> list[dict]:
 
 def get_catalog_sync_status() -> dict:
     return read_catalog_cache()
+
+
+_targets_snapshot: tuple[float, dict] | None = None
+
+
+def _synced_targets() -> dict:
+    # 每次分析都会查询模型上限，按文件修改时间缓存解析结果。
+    global _targets_snapshot
+    try:
+        mtime = CACHE_PATH.stat().st_mtime
+    except OSError:
+        return {}
+    if _targets_snapshot is None or _targets_snapshot[0] != mtime:
+        _targets_snapshot = (mtime, read_catalog_cache().get("targets", {}))
+    return _targets_snapshot[1]
+
+
+def get_model_limits(model: str | None, base_url: str | None = None) -> dict[str, int] | None:
+    """Synced limits for ``model``, preferring the target whose source shares ``base_url``'s host."""
+    if not model:
+        return None
+    host = urlparse(base_url or "").hostname
+    fallback = None
+    for target in _synced_targets().values():
+        limits = (target.get("limits") or {}).get(model)
+        if not limits:
+            continue
+        if host and urlparse(target.get("source") or "").hostname == host:
+            return limits
+        fallback = fallback or limits
+    return fallback
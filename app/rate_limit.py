@@ -0,0 +1,103 @@
+import asyncio
+import time
+from urllib.parse import urlparse
+
+from app.config import settings
+
+
+class TokenBucket:
+    """Refills ``per_minute`` units evenly over a minute; waiters queue FIFO."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = float(per_minute) / 60.0
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: float) -> None:
+        amount = min(float(amount), self.capacity)
+        async with self._lock:
+            started = time.monotonic()
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+            waited = time.monotonic() - started
+            if waited > 0.001:
+                self.waits += 1
+                self.wait_seconds += waited
+
+    def refund(self, amount: float) -> None:
+        self._refill()
+        self.tokens = max(0.0, min(self.capacity, self.tokens + amount))
+
+    def snapshot(self) -> dict:
+        self._refill()
+        return {
+            "capacity": self.capacity,
+            "available": round(self.tokens, 1),
+            "fill_ratio": round(self.tokens / self.capacity, 4) if self.capacity else 0.0,
+            "waits": self.waits,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+
+
+_buckets: dict[str, dict[str, TokenBucket]] = {}
+
+
+def _provider_key(base_url: str) -> str | None:
+    host = (urlparse(base_url).hostname or "").lower()
+    for key in settings.provider_rate_limits:
+        pattern = key.lower()
+        if host == pattern or host.endswith(f".{pattern}"):
+            return key
+    return None
+
+
+def _buckets_for(base_url: str) -> dict[str, TokenBucket]:
+    key = _provider_key(base_url)
+    if key is None:
+        return {}
+    buckets = _buckets.get(key)
+    if buckets is None:
+        limits = settings.provider_rate_limits[key]
+        buckets = {name: TokenBucket(limits[name]) for name in ("rpm", "tpm") if limits.get(name)}
+        _buckets[key] = buckets
+    return buckets
+
+
+async def acquire_quota(base_url: str, estimated_tokens: int) -> None:
+    """Wait until the provider's RPM and TPM buckets allow one more call."""
+    buckets = _buckets_for(base_url)
+    if "rpm" in buckets:
+        await buckets["rpm"].acquire(1)
+    if "tpm" in buckets:
+        await buckets["tpm"].acquire(estimated_tokens)
+
+
+def settle_tokens(base_url: str, estimated_tokens: int, actual_tokens: int | None) -> None:
+    """Return over-reserved tokens once the response reports real usage."""
+    if actual_tokens is None:
+        return
+    bucket = _buckets_for(base_url).get("tpm")
+    if bucket is not None and actual_tokens < estimated_tokens:
+        bucket.refund(estimated_tokens - actual_tokens)
+
+
+def rate_limit_status() -> dict:
+    return {
+        "configured": settings.provider_rate_limits,
+        "buckets": {
+            key: {name: bucket.snapshot() for name, bucket in buckets.items()}
+            for key, buckets in _buckets.items()
+        },
+    }
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+from app.config import settings
+
+DB_PATH = Path("data/llm_cache.db")
+
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+_initialized = False
+
+
+def init_cache() -> None:
+    global _initialized
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                content TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_hit_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_last_hit ON llm_responses(last_hit_at)")
+        conn.commit()
+    _initialized = True
+
+
+def response_key(
+    base_url: str,
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    temperature: float,
+    max_output_tokens: int,
+    reasoning: dict | None,
+) -> str:
+    raw = json.dumps(
+        [base_url.rstrip("/"), model, system_prompt, user_prompt, temperature, max_output_tokens, reasoning],
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get_response(cache_key: str) -> str | None:
+    """Blocking lookup; call it via ``asyncio.to_thread`` from the event loop."""
+    if not _initialized:
+        init_cache()
+    now = time.time()
+    with sqlite3.connect(DB_PATH) as conn:
+        row = conn.execute(
+            "SELECT content FROM llm_responses WHERE cache_key = ? AND created_at >= ?",
+            (cache_key, now - settings.llm_cache_ttl_seconds),
+        ).fetchone()
+        if not row:
+            _stats["misses"] += 1
+            return None
+        conn.execute(
+            "UPDATE llm_responses SET last_hit_at = ?, hits = hits + 1 WHERE cache_key = ?",
+            (now, cache_key),
+        )
+        conn.commit()
+    _stats["hits"] += 1
+    return row[0]
+
+
+def put_response(cache_key: str, model: str, content: str) -> None:
+    """Blocking write plus eviction; call it via ``asyncio.to_thread`` from the event loop."""
+    if not _initialized:
+        init_cache()
+    now = time.time()
+    size = len(content.encode("utf-8"))
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO llm_responses(cache_key, model, content, size, created_at, last_hit_at, hits)
+            VALUES (?, ?, ?, ?, ?, ?, 0)
+            """,
+            (cache_key, model, content, size, now, now),
+        )
+        _stats["writes"] += 1
+        _evict(conn, now)
+        conn.commit()
+
+
+def _evict(conn: sqlite3.Connection, now: float) -> None:
+    expired = conn.execute(
+        "DELETE FROM llm_responses WHERE created_at < ?",
+        (now - settings.llm_cache_ttl_seconds,),
+    ).rowcount
+    _stats["evictions"] += expired
+
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+    if total <= settings.llm_cache_max_bytes:
+        return
+    # 超出容量时按最近命中时间从旧到新淘汰。
+    victims = []
+    for cache_key, size in conn.execute("SELECT cache_key, size FROM llm_responses ORDER BY last_hit_at ASC"):
+        if total <= settings.llm_cache_max_bytes:
+            break
+        victims.append((cache_key,))
+        total -= size
+    conn.executemany("DELETE FROM llm_responses WHERE cache_key = ?", victims)
+    _stats["evictions"] += len(victims)
+
+
+def purge_responses() -> int:
+    if not _initialized:
+        init_cache()
+    with sqlite3.connect(DB_PATH) as conn:
+        removed = conn.execute("DELETE FROM llm_responses").rowcount
+        conn.commit()
+    return removed
+
+
+def response_cache_stats() -> dict:
+    if not _initialized:
+        init_cache()
+    with sqlite3.connect(DB_PATH) as conn:
+        entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else 0.0,
+        "entries": entries,
+        "bytes": total,
+        "max_bytes": settings.llm_cache_max_bytes,
+        "ttl_seconds": settings.llm_cache_ttl_seconds,
+        "enabled": settings.llm_cache_enabled,
+    }
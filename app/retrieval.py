@@ -0,0 +1,100 @@
+# app/retrieval.py
+
+"""
+论文片段 BM25 检索
+"""
+
+import math
+import re
+from collections import Counter
+
+from app.chunking import split_paragraphs
+from app.tokenizer import count_tokens
+
+_WORD_RE = re.compile(r"[a-z][a-z0-9\-]+|\d+(?:\.\d+)?")
+_CJK_RUN_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the their this to was we were which "
+    "with our these those can may also using use used than such into between over under based".split()
+)
+
+
+def tokenize_terms(text: str) -> list[str]:
+    """Lower-cased latin words and numbers plus CJK character bigrams."""
+    lowered = text.lower()
+    terms = [word for word in _WORD_RE.findall(lowered) if word not in _STOPWORDS]
+    for run in _CJK_RUN_RE.findall(lowered):
+        if len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+class BM25Index:
+    """In-memory inverted index over a list of chunks."""
+
+    def __init__(self, chunks: list[str], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.lengths: list[int] = []
+        self.postings: dict[str, list[tuple[int, int]]] = {}
+        for index, chunk in enumerate(chunks):
+            counts = Counter(tokenize_terms(chunk))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((index, tf))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.chunks) - df + 0.5) / (df + 0.5))
+
+    def scores(self, query: str) -> list[float]:
+        scores = [0.0] * len(self.chunks)
+        for term in set(tokenize_terms(query)):
+            idf = self._idf(term)
+            for index, tf in self.postings.get(term, ()):
+                norm = 1 - self.b + self.b * self.lengths[index] / (self.avg_length or 1.0)
+                scores[index] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        return scores
+
+    def search(self, query: str, top_k: int) -> list[tuple[int, float]]:
+        ranked = sorted(enumerate(self.scores(query)), key=lambda item: item[1], reverse=True)
+        return [(index, score) for index, score in ranked[:top_k] if score > 0]
+
+
+def build_index(text: str, chunk_tokens: int, model: str | None = None) -> BM25Index:
+    return BM25Index(split_paragraphs(text, chunk_tokens, model))
+
+
+def select_context(
+    index: BM25Index,
+    query: str,
+    budget_tokens: int,
+    top_k: int,
+    model: str | None = None,
+) -> str:
+    """Top-k chunks for ``query`` that fit ``budget_tokens``, restored to document order.
+
+    The first chunk (title and abstract) is always kept when it fits.
+    """
+    candidates = [0] if index.chunks else []
+    candidates += [chunk for chunk, _ in index.search(query, top_k) if chunk != 0]
+    picked: list[int] = []
+    used = 0
+    for chunk in candidates:
+        tokens = count_tokens(index.chunks[chunk], model)
+        if used + tokens > budget_tokens:
+            continue
+        picked.append(chunk)
+        used += tokens
+    parts: list[str] = []
+    previous = None
+    for chunk in sorted(picked):
+        if previous is not None and chunk != previous + 1:
+            parts.append("[……]")
+        parts.append(index.chunks[chunk])
+        previous = chunk
+    return "\n\n".join(parts)
@@ -0,0 +1,68 @@
+import asyncio
+import contextvars
+import itertools
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+# 请求与论文共用一个递增序号：序号越小开始得越早。
+_sequence = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class WorkTag:
+    """Which request and paper an LLM call belongs to, used to order limiter waiters."""
+
+    request: str
+    paper: int
+
+
+_current: ContextVar[WorkTag | None] = ContextVar("work_tag", default=None)
+
+
+def new_request_id() -> str:
+    return f"req-{next(_sequence)}"
+
+
+@contextmanager
+def work_scope(request: str) -> Iterator[WorkTag]:
+    """Tag every LLM call started in this context (including tasks created in it) as one paper of ``request``."""
+    tag = WorkTag(request=request, paper=next(_sequence))
+    token = _current.set(tag)
+    try:
+        yield tag
+    finally:
+        _current.reset(token)
+
+
+def current_work() -> WorkTag | None:
+    return _current.get()
+
+
+def bind_context(events: AsyncIterator[dict]) -> AsyncIterator[dict]:
+    """Run every step of ``events`` in the context current when this is called.
+
+    An async generator otherwise runs in whichever task iterates it, so calls it
+    makes after ``work_scope`` has exited would lose their tag.
+    """
+    return _drive_in_context(events, contextvars.copy_context())
+
+
+async def _drive_in_context(events: AsyncIterator[dict], context: contextvars.Context) -> AsyncIterator[dict]:
+    step: asyncio.Task | None = None
+    try:
+        while True:
+            step = asyncio.create_task(anext(events), context=context)
+            try:
+                item = await step
+            except StopAsyncIteration:
+                return
+            step = None
+            yield item
+    finally:
+        if step is not None and not step.done():
+            # 取消进行中的一步即可：生成器随异常退出。
+            step.cancel()
+        elif step is None:
+            await asyncio.create_task(events.aclose(), context=context)
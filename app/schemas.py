@@ -31,20 +31,26 @@ class AnalyzeOptions(BaseModel):
     angle_specs: list[AngleSpec] | None = None
     user_prompt: str | None = None
     max_input_chars: int | None = Field(default=None, ge=2000, le=30000)
+    max_input_tokens: int | None = Field(default=None, ge=1000)
     temperature: float = Field(default=0.2, ge=0.0, le=1.0)
     max_output_tokens: int | None = None
-    stream_mode: str = Field(default="sequential", pattern="^(sequential|parallel)$")
+    stream_mode: str = Field(default="sequential", pattern="^(sequential|parallel|pipelined|single_call)$")
     parallel_limit: int = Field(default=3, ge=1, le=8)
+    prompt_layout: str = Field(default="classic", pattern="^(classic|prefix_cache)$")
+    context_mode: str = Field(default="raw", pattern="^(raw|map_reduce|retrieval|digest)$")
     mock_mode: bool = False
     enable_reasoning: bool = False
     reasoning_effort: str = Field(default="high", pattern="^(low|medium|high)$")
     enable_final_report: bool = True
+    bypass_cache: bool = False
+    deadline_seconds: float | None = Field(default=None, ge=5, le=3600)
 
 
 class AngleResult(BaseModel):
     angle: str
     rounds: list[str]
     final: str
+    timed_out: bool = False
 
 
 class PaperAnalysisResponse(BaseModel):
@@ -52,8 +58,12 @@ class PaperAnalysisResponse(BaseModel):
     model: str
     base_url: str
     text_char_count: int
+    page_count: int | None = None
+    text_truncated: bool = False
     angles: list[AngleResult]
     final_report: str
+    final_report_timed_out: bool = False
+    usage: dict[str, int] | None = None
 
 
 class ProviderConfigCreate(BaseModel):
@@ -83,6 +93,23 @@ class ProviderConfigOut(BaseModel):
     updated_at: str
 
 
+class AnalysisJobOut(BaseModel):
+    job_id: str
+    status: str
+    filename: str
+    paper_title: str | None = None
+    angles_total: int
+    angles_done: int
+    attempts: int
+    error: str | None = None
+    created_at: str
+    updated_at: str
+
+
+class JobRetryRequest(BaseModel):
+    api_key: str | None = Field(default=None, min_length=8)
+
+
 class AngleExport(BaseModel):
     title: str
     content: str
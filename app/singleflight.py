@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import aclosing
+from typing import TypeVar
+
+from app.config import settings
+from app.metrics import incr
+from app.scheduler import bind_context
+from app.schemas import AnalyzeOptions
+
+T = TypeVar("T")
+
+# 进行中的分析：key -> StreamFlight / SharedCall，完成或无人订阅后移除。
+_flights: dict[str, "StreamFlight | SharedCall"] = {}
+_DELTA_EVENTS = ("angle_delta", "angle_reasoning_delta")
+_ANGLE_END_EVENTS = ("angle_done", "angle_error", "angle_timeout")
+
+
+def flight_key(kind: str, pdf_sha256: str, paper_title: str, options: AnalyzeOptions) -> str:
+    """Identity of an analysis: same PDF, title, model, angles and options (API key hashed)."""
+    data = options.model_dump(mode="json", exclude={"api_key", "provider_id"})
+    data["api_key"] = hashlib.sha256((options.api_key or "").encode("utf-8")).hexdigest()
+    payload = json.dumps([kind, pdf_sha256, paper_title, data], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _forget(key: str, flight: "StreamFlight | SharedCall") -> None:
+    if _flights.get(key) is flight:
+        del _flights[key]
+
+
+class StreamFlight:
+    """One running event stream shared by any number of subscribers.
+
+    Events are kept so a late subscriber first replays what it missed and then
+    follows the live tail; once an angle ends and every subscriber has read
+    past its deltas, they are collapsed into one event. The stream is cancelled
+    once the last subscriber leaves.
+    """
+
+    kind = "stream"
+
+    def __init__(self, key: str, source: AsyncIterator[dict]):
+        self.key = key
+        self.events: list[dict | None] = []
+        self.finished = False
+        self.error: Exception | None = None
+        self.subscribers = 0
+        self.started = time.monotonic()
+        self._wakeup = asyncio.Event()
+        # 各订阅者下一条要读的位置；已结束角度的增量位置，等所有订阅者读过后合并。
+        self._cursors: dict[int, int] = {}
+        self._next_subscriber = 0
+        self._deltas: dict[tuple[str, str], list[int]] = {}
+        self._ended: list[tuple[str, str]] = []
+        self.task = asyncio.create_task(self._run(source))
+
+    async def _run(self, source: AsyncIterator[dict]) -> None:
+        try:
+            async with aclosing(source) as events:
+                async for item in events:
+                    self._append(item)
+                    self._notify()
+        except Exception as exc:
+            self.error = exc
+        finally:
+            self.finished = True
+            self._notify()
+            _forget(self.key, self)
+
+    def _append(self, item: dict) -> None:
+        kind = item["event"]
+        if kind in _DELTA_EVENTS:
+            self._deltas.setdefault((kind, item["angle"]), []).append(len(self.events))
+        elif kind in _ANGLE_END_EVENTS:
+            self._ended.extend((delta, item["angle"]) for delta in _DELTA_EVENTS)
+        self.events.append(item)
+        self._compact()
+
+    def _compact(self) -> None:
+        read = min(self._cursors.values(), default=len(self.events))
+        waiting = []
+        for key in self._ended:
+            positions = self._deltas.get(key)
+            if not positions:
+                continue
+            if positions[-1] >= read:
+                # 仍有订阅者没读完这些增量，合并会让它漏掉内容，下次再试。
+                waiting.append(key)
+                continue
+            del self._deltas[key]
+            first = positions[0]
+            merged = "".join(self.events[position]["delta"] for position in positions)
+            self.events[first] = {**self.events[first], "delta": merged}
+            for position in positions[1:]:
+                self.events[position] = None
+        self._ended = waiting
+
+    def _notify(self) -> None:
+        self._wakeup.set()
+        self._wakeup = asyncio.Event()
+
+    async def subscribe(self) -> AsyncIterator[dict]:
+        self.subscribers += 1
+        subscriber = self._next_subscriber
+        self._next_subscriber += 1
+        self._cursors[subscriber] = 0
+        index = 0
+        try:
+            while True:
+                while index < len(self.events):
+                    item = self.events[index]
+                    index += 1
+                    self._cursors[subscriber] = index
+                    if item is not None:
+                        yield item
+                if self._ended:
+                    self._compact()
+                if self.finished:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._wakeup.wait()
+        finally:
+            self.subscribers -= 1
+            del self._cursors[subscriber]
+            if self.subscribers == 0 and not self.finished:
+                # 最后一个订阅者离开：新请求另起一轮，当前分析连同上游调用一并取消。
+                _forget(self.key, self)
+                self.task.cancel()
+
+    def snapshot(self) -> dict:
+        return {"subscribers": self.subscribers, "events": sum(1 for item in self.events if item is not None)}
+
+
+class SharedCall:
+    """One running coroutine whose result is handed to every caller waiting on it."""
+
+    kind = "call"
+
+    def __init__(self, key: str, work: Awaitable):
+        self.key = key
+        self.subscribers = 0
+        self.started = time.monotonic()
+        self.task = asyncio.ensure_future(work)
+        self.task.add_done_callback(lambda _: _forget(key, self))
+
+    async def wait(self):
+        self.subscribers += 1
+        try:
+            return await asyncio.shield(self.task)
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.task.done():
+                _forget(self.key, self)
+                self.task.cancel()
+
+    def snapshot(self) -> dict:
+        return {"subscribers": self.subscribers}
+
+
+def join_stream(key: str, start: Callable[[], AsyncIterator[dict]]) -> AsyncIterator[dict]:
+    """Subscribe to the in-flight stream for ``key``, starting it with ``start()`` if there is none."""
+    if not settings.singleflight_enabled:
+        # 生成器在调用方 work_scope 退出后才被迭代，需绑定当前上下文以保留调度标签。
+        return bind_context(start())
+    flight = _flights.get(key)
+    if isinstance(flight, StreamFlight):
+        incr("singleflight.joined")
+    else:
+        flight = StreamFlight(key, start())
+        _flights[key] = flight
+        incr("singleflight.started")
+    return flight.subscribe()
+
+
+async def run_shared(key: str, start: Callable[[], Awaitable[T]]) -> T:
+    """Await the in-flight call for ``key``, starting it with ``start()`` if there is none."""
+    if not settings.singleflight_enabled:
+        return await start()
+    flight = _flights.get(key)
+    if isinstance(flight, SharedCall):
+        incr("singleflight.joined")
+    else:
+        flight = SharedCall(key, start())
+        _flights[key] = flight
+        incr("singleflight.started")
+    return await flight.wait()
+
+
+def inflight_status() -> dict:
+    now = time.monotonic()
+    return {
+        "enabled": settings.singleflight_enabled,
+        "flights": [
+            {
+                "key": key[:16],
+                "kind": flight.kind,
+                "age_seconds": round(now - flight.started, 1),
+                **flight.snapshot(),
+            }
+            for key, flight in _flights.items()
+        ],
+    }
@@ -0,0 +1,73 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.config import settings
+from app.metrics import incr
+
+
+async def relay_until_disconnect(request: Request, source: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Relay ``source`` to the client, polling for disconnects while it is idle.
+
+    On disconnect the pending step is cancelled, which unwinds ``source`` and
+    cancels the LLM calls it started. The cancellation runs in the step's own
+    task, so it completes even if this generator is itself being torn down.
+    """
+    step: asyncio.Task | None = None
+    try:
+        while True:
+            step = asyncio.ensure_future(anext(source))
+            # 上游可能长时间无输出（排队、重试退避、首包等待），期间按间隔检查客户端是否已断开。
+            while not step.done():
+                try:
+                    await asyncio.wait({step}, timeout=settings.sse_disconnect_poll_seconds)
+                except asyncio.CancelledError:
+                    # ASGI spec < 2.4 的服务器（如 uvicorn）由 Starlette 监听断开并直接取消响应任务。
+                    incr("stream.client_disconnects")
+                    raise
+                if not step.done() and await request.is_disconnected():
+                    incr("stream.client_disconnects")
+                    return
+            try:
+                item = step.result()
+            except StopAsyncIteration:
+                return
+            step = None
+            yield item
+    finally:
+        if step is not None and not step.done():
+            step.cancel()
+        else:
+            # 停在 yield 处，或断开时这一步恰好已完成：源生成器空闲，直接关闭。
+            await source.aclose()
+
+
+class EventStreamResponse(StreamingResponse):
+    """``text/event-stream`` response that always closes its body iterator.
+
+    When the client disconnects while the body is suspended between events,
+    Starlette cancels the send and drops the generator without closing it;
+    closing it here runs the generator's cleanup right away instead of at
+    garbage collection.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(self, content: AsyncIterator[str]):
+        super().__init__(
+            content,
+            headers={
+                "Cache-Control": "no-cache",
+                "Connection": "keep-alive",
+                "X-Accel-Buffering": "no",
+            },
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.body_iterator.aclose()
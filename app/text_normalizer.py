@@ -0,0 +1,211 @@
+# app/text_normalizer.py
+
+"""
+PDF 提取文本的清洗与章节切分
+"""
+
+import re
+from collections import Counter
+
+# 页眉页脚只在每页开头/结尾的几行中查找。
+_EDGE_LINES = 3
+_PAGE_NUMBER_RE = re.compile(
+    r"^(?:page\s*)?[-–—\s]*\d{1,4}[-–—\s]*(?:(?:/|of)\s*\d{1,4})?$|^第\s*\d{1,4}\s*页(?:\s*/\s*共\s*\d{1,4}\s*页)?$",
+    re.IGNORECASE,
+)
+_DIGITS_RE = re.compile(r"\d+")
+_SPACES_RE = re.compile(r"[ \t\u00a0\u3000]+")
+_BLANK_RUN_RE = re.compile(r"\n{3,}")
+# 行尾（含跨页）连字符断词：下一行以小写单词开头时视为同一个单词；续接部分本身带连字符（state-of-the-art）时保留。
+_HYPHEN_BREAK_RE = re.compile(r"([A-Za-z])-\n(\n?)([a-z]+)(?![-a-z])")
+
+SECTION_KEYWORDS = {
+    "abstract": ("abstract", "摘要"),
+    "introduction": ("introduction", "引言", "绪论", "前言"),
+    "related_work": ("related work", "related works", "background", "preliminaries", "相关工作", "研究背景"),
+    "method": (
+        "method",
+        "methods",
+        "methodology",
+        "approach",
+        "our approach",
+        "proposed method",
+        "方法",
+        "研究方法",
+    ),
+    "experiments": ("experiments", "experiment", "experimental setup", "experimental results", "evaluation", "实验"),
+    "results": ("results", "results and discussion", "实验结果", "结果"),
+    "discussion": ("discussion", "analysis", "讨论", "分析"),
+    "limitations": ("limitations", "limitation", "局限性"),
+    "conclusion": ("conclusion", "conclusions", "conclusion and future work", "结论", "总结"),
+    "acknowledgements": ("acknowledgements", "acknowledgments", "acknowledgement", "acknowledgment", "致谢"),
+    "references": ("references", "bibliography", "参考文献"),
+    "appendix": ("appendix", "appendices", "supplementary material", "附录"),
+}
+_KEYWORD_TO_SECTION = {keyword: name for name, keywords in SECTION_KEYWORDS.items() for keyword in keywords}
+# 可选编号（1 / 2.1 / IV. / A / 一、）+ 关键词，整行不超过 60 个字符。
+_HEADING_RE = re.compile(
+    r"^(?:(?:\d+(?:\.\d+)*|[IVX]+|[A-Z]|[一二三四五六七八九十]+)[.、:：)]?\s+|[一二三四五六七八九十]+、)?"
+    r"(?P<title>[A-Za-z\u4e00-\u9fff][A-Za-z\u4e00-\u9fff &]*?)\s*[.:：]?$"
+)
+_MAX_HEADING_LEN = 60
+# 参考文献之后的附录式标题：编号/字母 + 附录常用词（A Proof of Lemma 1、B Additional Experiments）。
+_NUMBERED_HEADING_RE = re.compile(r"^(?:[A-Z]|\d+)(?:\.\d+)*[.:]?\s+(?P<title>[A-Z][A-Za-z-]*(?: [^,;]*)?)$")
+_APPENDIX_WORDS = {
+    "ablation",
+    "ablations",
+    "additional",
+    "derivation",
+    "derivations",
+    "details",
+    "experimental",
+    "hyperparameters",
+    "implementation",
+    "omitted",
+    "proof",
+    "proofs",
+    "supplementary",
+}
+
+
+def _edge_key(line: str) -> str:
+    return _DIGITS_RE.sub("#", _SPACES_RE.sub(" ", line).strip().lower())
+
+
+def _repeated_edge_lines(pages: list[list[str]]) -> set[str]:
+    # 页数太少时无法区分页眉页脚与正文。
+    if len(pages) < 3:
+        return set()
+    counts: Counter[str] = Counter()
+    for lines in pages:
+        edges = {_edge_key(line) for line in lines[:_EDGE_LINES] + lines[-_EDGE_LINES:] if line.strip()}
+        counts.update(edges)
+    threshold = max(3, len(pages) // 2)
+    return {key for key, count in counts.items() if count >= threshold and key}
+
+
+def _strip_page_edges(lines: list[str], repeated: set[str]) -> tuple[list[str], int]:
+    if sum(1 for line in lines if line.strip()) <= 1:
+        # 只有一行内容的页面（短文档、封面）不做页眉页脚判断。
+        return lines, 0
+    removed = 0
+    edge_range = set(range(_EDGE_LINES)) | set(range(len(lines) - _EDGE_LINES, len(lines)))
+    kept = []
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+        if index in edge_range and stripped and (
+            _edge_key(line) in repeated or _PAGE_NUMBER_RE.match(stripped)
+        ):
+            removed += 1
+            continue
+        kept.append(line)
+    if not any(line.strip() for line in kept):
+        # 整页都像页眉页脚时多半是误判（如各页内容相同的短文档），保留原样。
+        return lines, 0
+    return kept, removed
+
+
+def _heading_section(line: str) -> str | None:
+    stripped = line.strip()
+    if not stripped or len(stripped) > _MAX_HEADING_LEN:
+        return None
+    match = _HEADING_RE.match(stripped)
+    if match is None:
+        return None
+    return _KEYWORD_TO_SECTION.get(_SPACES_RE.sub(" ", match.group("title")).strip().lower())
+
+
+def detect_sections(text: str) -> list[dict]:
+    """Section map as ``{"name", "heading", "start", "end"}`` character offsets into ``text``."""
+    sections: list[dict] = []
+    offset = 0
+    for line in text.split("\n"):
+        name = _heading_section(line)
+        # 同名章节只记第一次出现（目录、正文引用里的同名行不再切分）。
+        if name and all(section["name"] != name for section in sections):
+            if sections:
+                sections[-1]["end"] = offset
+            sections.append({"name": name, "heading": line.strip(), "start": offset, "end": len(text)})
+        offset += len(line) + 1
+    return sections
+
+
+def _is_appendix_heading(line: str, earlier_lines: set[str]) -> bool:
+    stripped = line.strip()
+    if len(stripped) > _MAX_HEADING_LEN or stripped.endswith("."):
+        return False
+    match = _NUMBERED_HEADING_RE.match(stripped)
+    if match is None:
+        return False
+    # 文献条目折行也可能形如“A Survey of ...”，只认附录常用词开头或在正文（目录）中出现过的标题。
+    return match.group("title").split()[0].lower() in _APPENDIX_WORDS or stripped in earlier_lines
+
+
+def _drop_references(text: str) -> tuple[str, int]:
+    lines = []
+    offset = 0
+    for line in text.split("\n"):
+        lines.append((offset, line))
+        offset += len(line) + 1
+    # 取正文后部最后一个“References”标题：目录或过早出现的同名行多半是误判。
+    candidates = [
+        index
+        for index, (start, line) in enumerate(lines)
+        if start >= len(text) * 0.3 and _heading_section(line) == "references"
+    ]
+    if not candidates:
+        return text, 0
+    first = candidates[-1]
+    start = lines[first][0]
+    earlier_lines = {line.strip() for _, line in lines[:first]}
+    end = len(text)
+    for line_start, line in lines[first + 1 :]:
+        if _heading_section(line) or _is_appendix_heading(line, earlier_lines):
+            end = line_start
+            break
+    return text[:start] + text[end:], end - start
+
+
+def normalize_pages(pages: list[str], strip_references: bool = True) -> dict:
+    """Clean per-page PDF text and return ``text``, ``sections`` and ``stats``.
+
+    Drops running headers/footers and page numbers, rejoins hyphenated line
+    breaks, collapses whitespace and, optionally, removes the references section.
+    """
+    page_lines = [page.split("\n") for page in pages]
+    repeated = _repeated_edge_lines(page_lines)
+    cleaned_pages = []
+    edge_lines_removed = 0
+    for lines in page_lines:
+        kept, removed = _strip_page_edges(lines, repeated)
+        edge_lines_removed += removed
+        cleaned_pages.append("\n".join(_SPACES_RE.sub(" ", line).strip() for line in kept).strip())
+
+    text = "\n\n".join(page for page in cleaned_pages if page)
+    text = _HYPHEN_BREAK_RE.sub(r"\1\3", text)
+    text = _BLANK_RUN_RE.sub("\n\n", text).strip()
+
+    references_chars = 0
+    sections = detect_sections(text)
+    if strip_references:
+        text, references_chars = _drop_references(text)
+        if references_chars:
+            text = _BLANK_RUN_RE.sub("\n\n", text).strip()
+            sections = detect_sections(text)
+    fallback = not text
+    if fallback:
+        # 清洗不应让有内容的文档变空；出现这种情况时退回未清洗的文本。
+        text = "\n\n".join(page.strip() for page in pages if page.strip())
+        references_chars = 0
+        sections = detect_sections(text)
+    return {
+        "text": text,
+        "sections": sections,
+        "stats": {
+            "raw_chars": sum(len(page) for page in pages),
+            "chars": len(text),
+            "edge_lines_removed": edge_lines_removed,
+            "references_chars_removed": references_chars,
+            "fallback_to_raw": fallback,
+        },
+    }
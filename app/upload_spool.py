@@ -0,0 +1,43 @@
+import hashlib
+import os
+import tempfile
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from fastapi import UploadFile
+
+from app.config import settings
+
+
+def _spool_dir() -> str | None:
+    if not settings.upload_spool_dir:
+        return None
+    Path(settings.upload_spool_dir).mkdir(parents=True, exist_ok=True)
+    return settings.upload_spool_dir
+
+
+@asynccontextmanager
+async def spooled_upload(upload: UploadFile) -> AsyncIterator[dict]:
+    """Stream an upload to a temp file chunk by chunk, hashing it on the way.
+
+    Yields ``{"path", "sha256", "size"}``; the file is removed on exit. The PDF is
+    never held in memory as a whole, and extraction workers read it by path.
+    """
+    fd, path = tempfile.mkstemp(suffix=".pdf", dir=_spool_dir())
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await upload.read(settings.upload_chunk_bytes):
+                digest.update(chunk)
+                size += len(chunk)
+                out.write(chunk)
+        # 已落盘，释放 Starlette 自身的临时文件。
+        await upload.close()
+        yield {"path": path, "sha256": digest.hexdigest(), "size": size}
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
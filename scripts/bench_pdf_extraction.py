@@ -0,0 +1,88 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+from pypdf import PdfReader, PdfWriter
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.config import settings  # noqa: E402
+from app.extraction_engine import extract_pdf, shutdown_engine, start_engine  # noqa: E402
+
+
+def build_book(pdf: Path, repeat: int) -> bytes:
+    """Concatenate a sample PDF ``repeat`` times to get a book-length document."""
+    reader = PdfReader(str(pdf))
+    writer = PdfWriter()
+    for _ in range(repeat):
+        for page in reader.pages:
+            writer.add_page(page)
+    buf = BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+async def timed_extract(path: str, page_threshold: int) -> tuple[dict, float]:
+    """Run the production extraction path; ``page_threshold`` decides serial vs page-parallel."""
+    settings.extraction_parallel_page_threshold = page_threshold
+    start = time.perf_counter()
+    result = await extract_pdf(path)
+    return result, time.perf_counter() - start
+
+
+async def run(path: str, page_count: int, rounds: int) -> tuple[dict, float, dict, float]:
+    start_engine()
+    try:
+        serial_best = parallel_best = float("inf")
+        serial = parallel = {}
+        for _ in range(rounds):
+            # 阈值高于页数时整份文档在一个工作进程中解析；阈值为 1 时强制按页段并行。
+            serial, elapsed = await timed_extract(path, page_count + 1)
+            serial_best = min(serial_best, elapsed)
+            parallel, elapsed = await timed_extract(path, 1)
+            parallel_best = min(parallel_best, elapsed)
+        return serial, serial_best, parallel, parallel_best
+    finally:
+        shutdown_engine()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare serial and page-parallel PDF extraction")
+    parser.add_argument("pdf", type=Path, help="sample PDF file")
+    parser.add_argument("--repeat", type=int, default=1, help="concatenate the sample N times")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--pages-per-range", type=int, default=50, help="pages per parallel task")
+    parser.add_argument("--rounds", type=int, default=3, help="timing rounds (best is reported)")
+    args = parser.parse_args()
+
+    raw = build_book(args.pdf, args.repeat) if args.repeat > 1 else args.pdf.read_bytes()
+    page_count = len(PdfReader(BytesIO(raw)).pages)
+    print(f"[INFO] {args.pdf.name}: {page_count} pages, {len(raw) / 1024 / 1024:.1f} MB, workers={args.workers}")
+
+    settings.extraction_workers = args.workers
+    settings.extraction_pages_per_task = args.pages_per_range
+    # 关闭解析缓存，每轮都真正解析。
+    settings.extraction_cache_enabled = False
+    with tempfile.TemporaryDirectory() as tmp:
+        # 与上传接口一样按路径交给工作进程。
+        path = Path(tmp) / "bench.pdf"
+        path.write_bytes(raw)
+        serial, serial_best, parallel, parallel_best = asyncio.run(run(str(path), page_count, args.rounds))
+
+    if serial["text"] != parallel["text"] or serial["title"] != parallel["title"]:
+        print("[FAIL] parallel output differs from serial output")
+        return 1
+    print(f"[INFO] serial:   {serial_best:.3f}s")
+    print(f"[INFO] parallel: {parallel_best:.3f}s")
+    print(f"[PASS] speedup x{serial_best / parallel_best:.2f} ({len(serial['text'])} chars, identical output)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
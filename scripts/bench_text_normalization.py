@@ -0,0 +1,58 @@
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.pdf_service import PAGE_SEPARATOR, extract_page_range, probe_pdf  # noqa: E402
+from app.text_normalizer import normalize_pages  # noqa: E402
+from app.tokenizer import count_tokens  # noqa: E402
+
+
+def collect_pdfs(paths: list[Path]) -> list[Path]:
+    pdfs: list[Path] = []
+    for path in paths:
+        if path.is_dir():
+            pdfs.extend(sorted(path.rglob("*.pdf")))
+        elif path.suffix.lower() == ".pdf":
+            pdfs.append(path)
+    return pdfs
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure token savings of PDF text normalization")
+    parser.add_argument("paths", type=Path, nargs="+", help="PDF files or directories of PDFs")
+    parser.add_argument("--model", default=None, help="model name used for token estimation")
+    parser.add_argument("--keep-references", action="store_true", help="do not strip the references section")
+    args = parser.parse_args()
+
+    pdfs = collect_pdfs(args.paths)
+    if not pdfs:
+        print("[FAIL] no PDF files found")
+        return 1
+
+    total_raw = total_clean = 0
+    for pdf in pdfs:
+        source = str(pdf)
+        pages = extract_page_range(source, 0, probe_pdf(source)["page_count"])
+        raw_tokens = count_tokens(PAGE_SEPARATOR.join(pages), args.model)
+        result = normalize_pages(pages, strip_references=not args.keep_references)
+        clean_tokens = count_tokens(result["text"], args.model)
+        total_raw += raw_tokens
+        total_clean += clean_tokens
+        sections = ",".join(section["name"] for section in result["sections"]) or "-"
+        saved = 1 - clean_tokens / raw_tokens if raw_tokens else 0.0
+        print(
+            f"[INFO] {pdf.name}: {raw_tokens} -> {clean_tokens} tokens ({saved:.1%} saved), "
+            f"edge lines={result['stats']['edge_lines_removed']}, "
+            f"references chars={result['stats']['references_chars_removed']}, sections={sections}"
+        )
+
+    saved = 1 - total_clean / total_raw if total_raw else 0.0
+    print(f"[PASS] {len(pdfs)} PDFs: {total_raw} -> {total_clean} tokens ({saved:.1%} saved)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
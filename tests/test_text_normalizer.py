@@ -0,0 +1,49 @@
+from app.text_normalizer import normalize_pages
+
+BODY = "\n".join(f"Body sentence {i} describing the method and its results." for i in range(60))
+WRAPPED_REFERENCES = """References
+[1] J. Smith, A. Jones. A Survey of Deep Learning Methods for
+Natural Language Processing. 2020.
+[2] C. Raffel, N. Shazeer, A. Roberts. Exploring the limits of transfer learning.
+J Mach Learn Res 21(140):1-67
+[3] D. Kingma, J. Ba. Adam:
+A Method for Stochastic Optimization. ICLR 2015.
+[4] Last Author, Another Title. 2019."""
+
+
+def test_wrapped_references_are_stripped_completely():
+    result = normalize_pages([BODY, WRAPPED_REFERENCES])
+    assert "Body sentence 59" in result["text"]
+    for fragment in ("Survey of Deep Learning", "J Mach Learn Res", "Stochastic Optimization", "Last Author"):
+        assert fragment not in result["text"]
+
+
+def test_lettered_appendix_after_references_is_kept():
+    result = normalize_pages([BODY, WRAPPED_REFERENCES + "\nA Proof of Lemma 1\nThe proof follows by induction."])
+    assert "Last Author" not in result["text"]
+    assert "A Proof of Lemma 1\nThe proof follows by induction." in result["text"]
+
+
+def test_appendix_listed_in_contents_is_kept():
+    contents = "Contents\n1 Introduction\nReferences\nB Notation Table\n"
+    result = normalize_pages([contents + BODY, WRAPPED_REFERENCES + "\nB Notation Table\nSymbols used."])
+    assert "Last Author" not in result["text"]
+    assert "Symbols used." in result["text"]
+
+
+def test_contents_entry_does_not_disable_stripping():
+    result = normalize_pages(["Contents\nReferences\n" + BODY, WRAPPED_REFERENCES])
+    assert result["stats"]["references_chars_removed"] > 0
+    assert "Last Author" not in result["text"]
+
+
+def test_single_line_pages_are_not_emptied():
+    pages = ["Short synthetic page 1", "Short synthetic page 2", "Short synthetic page 3", "Short synthetic page 4"]
+    result = normalize_pages(pages)
+    assert result["text"].count("Short synthetic page") == 4
+
+
+def test_identical_short_pages_fall_back_to_their_text():
+    pages = ["Same header\nSame body line"] * 4
+    result = normalize_pages(pages)
+    assert "Same body line" in result["text"]